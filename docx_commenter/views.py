@@ -1,78 +1,48 @@
-import os
-from django.conf import settings
 from django.http import FileResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.parsers import MultiPartParser
-from docx_editor.models import Document, Paragraph, Comment, DocumentImage
+from docx_editor.models import Document, DocumentImage
 from docx_editor.views import UploadDocumentView as BaseUploadView
 from docx_editor.views import AddCommentView as BaseAddCommentView
 from docx_editor.views import DeleteCommentView as BaseDeleteCommentView
-from docx_editor.views import GetDocumentVersionsView, DocumentVersionStatsView
-from docx_editor.serializers import DocumentSerializer
+from docx_editor.views import GetDocumentVersionsView, DocumentVersionStatsView, ListDocumentsView
+from docx_editor.views import FILE_RESPONSE_BLOCK_SIZE, paragraph_payloads, parse_pending_response, _wait_for_docx_writes
 
 class CommentUploadDocumentView(BaseUploadView):
     def post(self, request):
         # Reuse the base upload functionality
         response = super().post(request)
         
-        if response.status_code == status.HTTP_200_OK:
+        # Background uploads answer 202 with the document ID before parsing
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_202_ACCEPTED):
             # Update the document to be comment-only
             # The response structure is: {'status': 'success', 'data': {'document_id': ...}}
             document_id = response.data['data']['document_id']
-            document = Document.objects.get(id=document_id)
-            document.is_editable = False
-            document.save()
+            Document.objects.filter(id=document_id, is_editable=True).update(is_editable=False)
         
         return response
 
-class ListDocumentsView(APIView):
-    def get(self, request):
-        # List all documents for commenting
-        documents = Document.objects.all()
-        serializer = DocumentSerializer(documents, many=True)
-        return Response(serializer.data)
-
 class ViewDocumentView(APIView):
     def get(self, request, document_id):
         try:
             document = Document.objects.get(id=document_id)
             
-            paragraphs_data = []
-            for para in document.paragraphs.all().order_by('paragraph_id'):
-                para_data = {
-                    'id': para.paragraph_id,
-                    'text': para.text,
-                    'html_content': para.html_content,
-                    'has_images': para.has_images
-                }
-                
-                # Add image information if paragraph has images
-                if para.has_images:
-                    images = []
-                    for para_img in para.paragraph_images.all():
-                        images.append({
-                            'id': para_img.document_image.id,
-                            'filename': para_img.document_image.filename,
-                            'image_id': para_img.document_image.image_id,
-                            'position': para_img.position_in_paragraph
-                        })
-                    para_data['images'] = images
-                
-                paragraphs_data.append(para_data)
+            # Paragraph rows as dicts, with every image fetched in one query
+            paragraphs_data = list(paragraph_payloads(document))
             
-            comments_data = []
-            for comment in document.comments.all():
-                comments_data.append({
-                    'id': comment.comment_id,
-                    'author': comment.author,
-                    'text': comment.text,
-                    'paragraph_id': comment.paragraph.paragraph_id,
-                    'created_at': comment.created_at
-                })
+            # Only the fields returned; the paragraph number comes from the join
+            comments_data = [{
+                'id': comment['comment_id'],
+                'author': comment['author'],
+                'text': comment['text'],
+                'paragraph_id': comment['paragraph__paragraph_id'],
+                'created_at': comment['created_at']
+            } for comment in document.comments.values(
+                'comment_id', 'author', 'text', 'paragraph__paragraph_id', 'created_at'
+            )]
             
             return Response({
                 'document_id': document.id,
@@ -96,10 +66,9 @@ class AddCommentView(BaseAddCommentView):
     def post(self, request):
         document_id = request.data.get('document_id')
         
-        try:
-            # Verify document exists (allow commenting on any document)
-            document = Document.objects.get(id=document_id)
-        except Document.DoesNotExist:
+        # Verify document exists (allow commenting on any document); the base
+        # view loads what it needs itself, so no row is fetched here
+        if not Document.objects.filter(id=document_id).exists():
             return Response({'error': 'Document not found'}, 
                           status=status.HTTP_404_NOT_FOUND)
         
@@ -109,24 +78,11 @@ class AddCommentView(BaseAddCommentView):
 
 @method_decorator(csrf_exempt, name='dispatch')
 class DeleteCommentView(BaseDeleteCommentView):
-    def delete(self, request):
-        # Parse JSON data from request body for DELETE requests
-        try:
-            import json
-            data = json.loads(request.body.decode('utf-8'))
-            document_id = data.get('document_id')
-        except (json.JSONDecodeError, UnicodeDecodeError):
-            return Response({'error': 'Invalid JSON in request body'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        try:
-            # Allow deleting comments from any document
-            document = Document.objects.get(id=document_id)
-        except Document.DoesNotExist:
-            return Response({'error': 'Document not found'}, 
-                          status=status.HTTP_404_NOT_FOUND)
-        
-        # Use the base delete functionality
-        return super().delete(request)
+    """Delete comment view for the commenter (comments can be deleted from any document).
+
+    The base view parses the body and answers a missing document with a 404
+    itself, so the request is parsed and the document looked up only once.
+    """
 
 
 class ExportDocumentView(APIView):
@@ -134,17 +90,29 @@ class ExportDocumentView(APIView):
         try:
             # Allow export of any document from commenter
             document = Document.objects.get(id=document_id)
+            not_ready = parse_pending_response(document.parse_status)
+            if not_ready:
+                return not_ready
+            
+            # A write in progress on the file lands before it is read
+            _wait_for_docx_writes(document.file_path)
             
-            if os.path.exists(document.file_path):
-                response = FileResponse(
-                    open(document.file_path, 'rb'),
-                    as_attachment=True,
-                    filename=f"commented_{document.filename}"
-                )
-                return response
-            else:
+            # Unbuffered, like the base export: FileResponse reads whole blocks
+            # itself, and servers with wsgi.file_wrapper sendfile() from the fd.
+            # A missing file surfaces here, so there's no separate exists() stat
+            try:
+                file = open(document.file_path, 'rb', buffering=0)
+            except FileNotFoundError:
                 return Response({'error': 'File not found'}, 
                               status=status.HTTP_404_NOT_FOUND)
+            
+            response = FileResponse(
+                file,
+                as_attachment=True,
+                filename=f"commented_{document.filename}"
+            )
+            response.block_size = FILE_RESPONSE_BLOCK_SIZE
+            return response
                 
         except Document.DoesNotExist:
             return Response({'error': 'Document not found'}, 
@@ -158,14 +126,15 @@ class ServeImageView(APIView):
             image = DocumentImage.objects.get(id=image_id)
             
             # Allow serving images from any document (no access restriction)
-            if os.path.exists(image.file_path):
-                response = FileResponse(
-                    open(image.file_path, 'rb'),
-                    content_type=image.content_type
-                )
-                return response
-            else:
+            # One open attempt instead of an exists() stat followed by the open
+            try:
+                image_file = open(image.file_path, 'rb')
+            except FileNotFoundError:
                 return Response({'error': 'Image file not found'}, status=status.HTTP_404_NOT_FOUND)
+            
+            response = FileResponse(image_file, content_type=image.content_type)
+            response.block_size = FILE_RESPONSE_BLOCK_SIZE
+            return response
                 
         except DocumentImage.DoesNotExist:
             return Response({'error': 'Image not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -1,6 +1,7 @@
 # Basic ML compliance functionality for testing
 # This file can be expanded with full ML features later
 import re
+from functools import lru_cache
 from typing import Dict, Any
 
 def basic_compliance_check(original_text, comment_text, edited_text):
@@ -174,10 +175,25 @@ class BasicComplianceChecker:
         """Make a prediction using basic rules"""
         return basic_compliance_check(original, comment, edited)
     
+    def predict_batch(self, originals, comments, edits):
+        """Make predictions for many comment-edit pairs"""
+        return [
+            basic_compliance_check(original, comment, edited)
+            for original, comment, edited in zip(originals, comments, edits)
+        ]
+    
+    def predict_with_explanation(self, original, comment, edited):
+        """Make a prediction and explain it from a single rules pass"""
+        result = basic_compliance_check(original, comment, edited)
+        return result, self._build_explanation(result, comment)
+    
     def explain_prediction(self, original, comment, edited):
         """Provide explanation for the prediction"""
         result = basic_compliance_check(original, comment, edited)
-        
+        return self._build_explanation(result, comment)
+    
+    def _build_explanation(self, result, comment):
+        """Explain an already-computed rules result"""
         explanation = {
             'interpretation': result['explanations'],
             'top_features': [('text_similarity', 0.3), ('word_overlap', 0.4)]
@@ -194,6 +210,7 @@ class BasicComplianceChecker:
         return explanation
 
 
+@lru_cache(maxsize=1)
 def get_basic_compliance_model():
-    """Get the basic compliance model (no ML dependencies needed)"""
+    """Get the basic compliance model (no ML dependencies needed), shared per process"""
     return BasicComplianceChecker()
\ No newline at end of file
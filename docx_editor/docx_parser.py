@@ -1,7 +1,9 @@
 import os
+import posixpath
 import shutil
 import zipfile
-import xml.etree.ElementTree as ET
+from contextlib import nullcontext
+from lxml import etree
 from django.conf import settings
 from .models import Document, Paragraph, DocumentImage, ParagraphImage
 import base64
@@ -9,6 +11,35 @@ import uuid
 import re
 from docx import Document as DocxDocument
 
+# Clark-notation names for the elements walked on every paragraph and run.
+# find() with a prefixed path re-keys lxml's path cache on the sorted
+# namespace map every call; a Clark name skips that
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+W = '{%s}' % W_NS
+P_TAG = W + 'p'
+R_TAG = W + 'r'
+PPR_TAG = W + 'pPr'
+JC_TAG = W + 'jc'
+PSTYLE_TAG = W + 'pStyle'
+RPR_TAG = W + 'rPr'
+B_TAG = W + 'b'
+I_TAG = W + 'i'
+U_TAG = W + 'u'
+W_VAL = W + 'val'
+DRAWING_TAG = W + 'drawing'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+RELS_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+BLIP_TAG = '{%s}blip' % A_NS
+R_EMBED = '{%s}embed' % R_NS
+REL_TAG = '{%s}Relationship' % RELS_NS
+
+# lxml parser for package parts: no xml:id table, never expands entities
+XML_PARSER = etree.XMLParser(collect_ids=False, resolve_entities=False)
+
+# A run's text nodes in document order, as plain str (no back-reference to the tree)
+RUN_TEXT_XPATH = etree.XPath('.//w:t/text()', namespaces={'w': W_NS}, smart_strings=False)
+
 
 class EnhancedDocxParser:
     """Enhanced DOCX parser that extracts images and formatting"""
@@ -16,7 +47,7 @@ class EnhancedDocxParser:
     def __init__(self, file_path, document_instance):
         self.file_path = file_path
         self.document = document_instance
-        self.temp_dir = None
+        self.docx_zip = None
         self.namespaces = {
             'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main',
             'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
@@ -25,45 +56,43 @@ class EnhancedDocxParser:
         }
         self.image_relationships = {}
         self.extracted_images = {}
+        self.paragraphs = {}  # Saved Paragraph rows by paragraph_id, filled by parse_document
         
-    def parse_document(self):
-        """Main parsing method that extracts paragraphs and images"""
-        try:
-            # Create temp directory for extraction
-            self.temp_dir = f"{self.file_path}_extract_{uuid.uuid4().hex[:8]}"
-            
-            # Extract DOCX contents
-            with zipfile.ZipFile(self.file_path, 'r') as zip_ref:
-                zip_ref.extractall(self.temp_dir)
-            
-            # Parse relationships to find images
-            self._parse_image_relationships()
-            
-            # Extract images from the archive
-            self._extract_images()
-            
-            # Parse document content
-            paragraphs_data = self._parse_paragraphs()
-            
-            return paragraphs_data
-            
-        finally:
-            # Cleanup temp directory
-            if self.temp_dir and os.path.exists(self.temp_dir):
-                shutil.rmtree(self.temp_dir)
+    def parse_document(self, docx_zip=None):
+        """Main parsing method that extracts paragraphs and images
+
+        docx_zip may be an archive the caller already has open on file_path;
+        it is used as-is and left open.
+        """
+        # Parts are read straight from the archive; nothing is extracted to disk
+        with nullcontext(docx_zip) if docx_zip is not None else zipfile.ZipFile(self.file_path, 'r') as docx_zip:
+            self.docx_zip = docx_zip
+            try:
+                # Parse relationships to find images
+                self._parse_image_relationships()
+                
+                # Extract images from the archive
+                self._extract_images()
+                
+                # Parse document content
+                paragraphs_data = self._parse_paragraphs()
+                
+                return paragraphs_data
+                
+            finally:
+                self.docx_zip = None
     
     def _parse_image_relationships(self):
         """Parse document relationships to find image references"""
-        rels_path = os.path.join(self.temp_dir, 'word', '_rels', 'document.xml.rels')
+        rels_member = 'word/_rels/document.xml.rels'
         
-        if not os.path.exists(rels_path):
+        if rels_member not in self.docx_zip.NameToInfo:
             return
         
         try:
-            tree = ET.parse(rels_path)
-            root = tree.getroot()
+            root = etree.fromstring(self.docx_zip.read(rels_member), XML_PARSER)
             
-            for rel in root.findall('.//{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'):
+            for rel in root.iter(REL_TAG):
                 rel_type = rel.get('Type', '')
                 if 'image' in rel_type.lower():
                     rel_id = rel.get('Id')
@@ -78,37 +107,48 @@ class EnhancedDocxParser:
         media_images_dir = os.path.join(settings.MEDIA_ROOT, 'document_images', str(self.document.id))
         os.makedirs(media_images_dir, exist_ok=True)
         
+        images_to_create = []
+        
         for rel_id, image_path in self.image_relationships.items():
-            # Full path to image in extracted DOCX
-            full_image_path = os.path.join(self.temp_dir, 'word', image_path)
+            # Archive member name of the image (targets are relative to word/)
+            image_member = posixpath.normpath(posixpath.join('word', image_path))
             
-            if os.path.exists(full_image_path):
+            if image_member in self.docx_zip.NameToInfo:
                 try:
                     # Generate unique filename
                     original_name = os.path.basename(image_path)
                     name, ext = os.path.splitext(original_name)
                     unique_filename = f"{uuid.uuid4().hex[:8]}_{name}{ext}"
                     
-                    # Copy image to media directory
+                    # Stream image from the archive to media directory
                     dest_path = os.path.join(media_images_dir, unique_filename)
-                    shutil.copy2(full_image_path, dest_path)
+                    with self.docx_zip.open(image_member) as source, open(dest_path, 'wb') as destination:
+                        shutil.copyfileobj(source, destination, 1024 * 1024)
                     
                     # Determine content type
                     content_type = self._get_content_type(ext.lower())
                     
-                    # Create DocumentImage instance
-                    doc_image = DocumentImage.objects.create(
+                    # DocumentImage rows are inserted together once every image is on disk
+                    images_to_create.append(DocumentImage(
                         document=self.document,
                         image_id=rel_id,
                         filename=original_name,
                         file_path=dest_path,
                         content_type=content_type
-                    )
-                    
-                    self.extracted_images[rel_id] = doc_image
+                    ))
                     
                 except Exception as e:
                     print(f"Error extracting image {image_path}: {e}")
+        
+        DocumentImage.objects.bulk_create(images_to_create)
+        
+        # Image ids go into the paragraph HTML; fetch them in one query if the backend didn't return them
+        if images_to_create and images_to_create[0].pk is None:
+            ids = dict(DocumentImage.objects.filter(document=self.document).values_list('image_id', 'id'))
+            for doc_image in images_to_create:
+                doc_image.pk = ids[doc_image.image_id]
+        
+        self.extracted_images = {doc_image.image_id: doc_image for doc_image in images_to_create}
     
     def _get_content_type(self, ext):
         """Get content type based on file extension"""
@@ -124,44 +164,59 @@ class EnhancedDocxParser:
     
     def _parse_paragraphs(self):
         """Parse paragraphs with formatting and image references"""
-        document_xml_path = os.path.join(self.temp_dir, 'word', 'document.xml')
+        document_member = 'word/document.xml'
         
-        if not os.path.exists(document_xml_path):
+        if document_member not in self.docx_zip.NameToInfo:
             raise Exception("Document.xml not found")
         
-        tree = ET.parse(document_xml_path)
-        root = tree.getroot()
+        # Parsed while it decompresses; the XML is never held as one bytes object
+        with self.docx_zip.open(document_member) as document_xml:
+            root = etree.parse(document_xml, XML_PARSER).getroot()
         
-        paragraphs_data = []
+        paragraphs_to_create = []
+        image_links = []
         paragraph_counter = 0  # Counter for consecutive paragraph IDs in database
         
         # Find all paragraphs
-        for para_elem in root.findall('.//w:p', self.namespaces):
+        for para_elem in root.iter(P_TAG):
             # Extract text and HTML content
             text_content, html_content, has_images = self._process_paragraph(para_elem)
             
             # Only create paragraph if it has content
             if text_content.strip() or has_images:
                 paragraph_counter += 1  # Increment only when creating a paragraph
-                paragraph = Paragraph.objects.create(
+                paragraph = Paragraph(
                     document=self.document,
                     paragraph_id=paragraph_counter,
                     text=text_content,
                     html_content=html_content,
                     has_images=has_images
                 )
+                paragraphs_to_create.append(paragraph)
                 
-                # Link images to this paragraph
-                self._link_paragraph_images(para_elem, paragraph)
-                
-                paragraphs_data.append({
-                    'id': paragraph_counter,
-                    'text': text_content,
-                    'html_content': html_content,
-                    'has_images': has_images
-                })
-        
-        return paragraphs_data
+                # Link images to this paragraph (saved once the paragraphs have ids)
+                image_links.extend(self._link_paragraph_images(para_elem, paragraph))
+        
+        # One multi-row INSERT per batch instead of one per paragraph
+        batch_size = getattr(settings, 'PARAGRAPH_BULK_BATCH_SIZE', 1000)
+        Paragraph.objects.bulk_create(paragraphs_to_create, batch_size=batch_size)
+        
+        # Backends that can't return ids from a bulk INSERT leave pk unset; fetch them in one query
+        if paragraphs_to_create and paragraphs_to_create[0].pk is None:
+            ids = dict(Paragraph.objects.filter(document=self.document).values_list('paragraph_id', 'id'))
+            for paragraph in paragraphs_to_create:
+                paragraph.pk = ids[paragraph.paragraph_id]
+        
+        ParagraphImage.objects.bulk_create(image_links, batch_size=batch_size)
+        self.paragraphs = {paragraph.paragraph_id: paragraph for paragraph in paragraphs_to_create}
+        
+        # Response data comes from the saved rows themselves, not a parallel list
+        return [{
+            'id': paragraph.paragraph_id,
+            'text': paragraph.text,
+            'html_content': paragraph.html_content,
+            'has_images': paragraph.has_images
+        } for paragraph in paragraphs_to_create]
     
     def _process_paragraph(self, para_elem):
         """Process a paragraph element to extract text, HTML, and images"""
@@ -170,21 +225,21 @@ class EnhancedDocxParser:
         has_images = False
         
         # Check paragraph properties for alignment and styling
-        para_props = para_elem.find('w:pPr', self.namespaces)
+        para_props = para_elem.find(PPR_TAG)
         alignment = None
         is_heading = False
         heading_level = None
         
         if para_props is not None:
             # Check alignment
-            jc = para_props.find('w:jc', self.namespaces)
+            jc = para_props.find(JC_TAG)
             if jc is not None:
-                alignment = jc.get('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}val')
+                alignment = jc.get(W_VAL)
             
             # Check if it's a heading (look for heading style)
-            style_elem = para_props.find('w:pStyle', self.namespaces)
+            style_elem = para_props.find(PSTYLE_TAG)
             if style_elem is not None:
-                style_val = style_elem.get('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}val')
+                style_val = style_elem.get(W_VAL)
                 if style_val and 'heading' in style_val.lower():
                     is_heading = True
                     # Extract heading level (e.g., "Heading1" -> 1)
@@ -197,7 +252,7 @@ class EnhancedDocxParser:
                     heading_level = 1
         
         # Process all runs in the paragraph
-        for run in para_elem.findall('.//w:r', self.namespaces):
+        for run in para_elem.iter(R_TAG):
             run_text, run_html, run_has_image = self._process_run(run)
             text_parts.append(run_text)
             html_parts.append(run_html)
@@ -236,16 +291,16 @@ class EnhancedDocxParser:
         has_image = False
         
         # Check for text
-        for text_elem in run_elem.findall('.//w:t', self.namespaces):
-            if text_elem.text:
-                text_content += text_elem.text
-                
-                # Get formatting
-                formatted_text = self._apply_formatting(text_elem.text, run_elem)
-                html_content += formatted_text
+        texts = RUN_TEXT_XPATH(run_elem)
+        if texts:
+            text_content = ''.join(texts)
+            
+            # Get formatting once per run; every text node in it shares the same tags
+            open_tags, close_tags = self._formatting_tags(run_elem)
+            html_content = ''.join(f'{open_tags}{text}{close_tags}' for text in texts)
         
         # Check for images
-        for drawing in run_elem.findall('.//w:drawing', self.namespaces):
+        for drawing in run_elem.iter(DRAWING_TAG):
             img_html = self._process_drawing(drawing)
             if img_html:
                 html_content += img_html
@@ -255,36 +310,37 @@ class EnhancedDocxParser:
         
         return text_content, html_content, has_image
     
-    def _apply_formatting(self, text, run_elem):
-        """Apply formatting to text based on run properties"""
+    def _formatting_tags(self, run_elem):
+        """Opening and closing HTML tags for a run's formatting, as a pair of strings"""
         # Get run properties
-        run_props = run_elem.find('w:rPr', self.namespaces)
+        run_props = run_elem.find(RPR_TAG)
         
         if run_props is None:
-            return text
+            return '', ''
         
         # Check for various formatting
-        is_bold = run_props.find('w:b', self.namespaces) is not None
-        is_italic = run_props.find('w:i', self.namespaces) is not None
-        is_underline = run_props.find('w:u', self.namespaces) is not None
+        is_bold = run_props.find(B_TAG) is not None
+        is_italic = run_props.find(I_TAG) is not None
+        is_underline = run_props.find(U_TAG) is not None
         
-        # Apply HTML tags
+        # Build HTML tags, bold innermost and underline outermost
+        open_tags = close_tags = ''
         if is_bold:
-            text = f'<strong>{text}</strong>'
+            open_tags, close_tags = '<strong>', '</strong>'
         if is_italic:
-            text = f'<em>{text}</em>'
+            open_tags, close_tags = '<em>' + open_tags, close_tags + '</em>'
         if is_underline:
-            text = f'<u>{text}</u>'
+            open_tags, close_tags = '<u>' + open_tags, close_tags + '</u>'
         
-        return text
+        return open_tags, close_tags
     
     def _process_drawing(self, drawing_elem):
         """Process drawing elements (images)"""
         try:
             # Find the relationship ID
-            blip = drawing_elem.find('.//a:blip', self.namespaces)
+            blip = next(drawing_elem.iter(BLIP_TAG), None)
             if blip is not None:
-                rel_id = blip.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed')
+                rel_id = blip.get(R_EMBED)
                 
                 if rel_id and rel_id in self.extracted_images:
                     doc_image = self.extracted_images[rel_id]
@@ -297,25 +353,28 @@ class EnhancedDocxParser:
         return ''
     
     def _link_paragraph_images(self, para_elem, paragraph):
-        """Link images found in paragraph to the paragraph"""
+        """Build unsaved ParagraphImage links for the images found in paragraph"""
+        links = []
         position = 0
         
         # Find all drawings in this paragraph
-        for drawing in para_elem.findall('.//w:drawing', self.namespaces):
+        for drawing in para_elem.iter(DRAWING_TAG):
             try:
-                blip = drawing.find('.//a:blip', self.namespaces)
+                blip = next(drawing.iter(BLIP_TAG), None)
                 if blip is not None:
-                    rel_id = blip.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed')
+                    rel_id = blip.get(R_EMBED)
                     
                     if rel_id and rel_id in self.extracted_images:
                         doc_image = self.extracted_images[rel_id]
                         
-                        ParagraphImage.objects.create(
+                        links.append(ParagraphImage(
                             paragraph=paragraph,
                             document_image=doc_image,
                             position_in_paragraph=position
-                        )
+                        ))
                         position += 1
             
             except Exception as e:
-                print(f"Error linking image to paragraph: {e}")
\ No newline at end of file
+                print(f"Error linking image to paragraph: {e}")
+        
+        return links
\ No newline at end of file
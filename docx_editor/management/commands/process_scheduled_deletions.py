@@ -7,7 +7,7 @@ This should be run via cron job every minute or so
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from docx_editor.models import Comment
-from docx_editor.views import XMLFormattingMixin
+from docx_editor.views import XMLFormattingMixin, _run_docx_write
 import zipfile
 import os
 
@@ -68,8 +68,8 @@ class Command(BaseCommand, XMLFormattingMixin):
                         # Check file integrity
                         with zipfile.ZipFile(comment.document.file_path, 'r') as test_zip:
                             test_zip.testzip()
-                        # Delete comment from DOCX
-                        self.delete_comment_from_docx(comment.document.file_path, comment.comment_id)
+                        # Delete comment from DOCX, under the same file lock the web workers take
+                        _run_docx_write(self.delete_comment_from_docx, comment.document.file_path, comment.comment_id)
                     except Exception as docx_error:
                         docx_success = False
                         self.stdout.write(
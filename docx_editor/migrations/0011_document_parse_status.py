@@ -0,0 +1,23 @@
+# Generated migration for background parsing of uploads
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('docx_editor', '0009_add_edited_commented_paragraphs_tracking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='parse_status',
+            field=models.CharField(
+                choices=[('parsing', 'Parsing'), ('ready', 'Ready'), ('failed', 'Failed')],
+                default='ready',
+                max_length=10,
+                help_text='Whether the uploaded DOCX has been parsed into paragraphs and comments'
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated migration for the (document, comment_id) comment index
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('docx_editor', '0011_document_parse_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['document', 'comment_id'], name='comment_doc_id_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated migration for remembering that a DOCX is wired for comments
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('docx_editor', '0012_comment_doc_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='has_comments_rel',
+            field=models.BooleanField(
+                default=False,
+                help_text='Whether the DOCX already relates comments.xml and registers its content type'
+            ),
+        ),
+    ]
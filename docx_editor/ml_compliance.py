@@ -7,6 +7,7 @@ import os
 import pickle
 import re
 import difflib
+from functools import lru_cache
 from typing import Dict, List, Tuple, Optional, Any
 
 # Try to import ML dependencies gracefully
@@ -73,6 +74,22 @@ CONSTRAINT_PATTERNS = {
 }
 
 
+@lru_cache(maxsize=1024)
+def _sentiment_polarity(text: str) -> float:
+    """TextBlob polarity of a text, memoized per process.
+
+    Real-time checks resend the same original paragraph and comment texts on
+    every keystroke; only the edited text is new.
+    """
+    return TextBlob(text).sentiment.polarity
+
+
+@lru_cache(maxsize=1024)
+def _comment_constraints(comment_text: str) -> Dict[str, Any]:
+    """Constraints detected in a comment, memoized per process (treat as read-only)"""
+    return ConstraintDetector().detect_constraints(comment_text)
+
+
 class ConstraintDetector:
     """Detect and validate specific constraints mentioned in comments"""
     
@@ -262,13 +279,13 @@ class ComplianceFeatureExtractor:
         
         # Sentiment analysis
         try:
-            original_sentiment = TextBlob(original).sentiment
-            comment_sentiment = TextBlob(comment).sentiment
-            edited_sentiment = TextBlob(edited).sentiment
+            original_polarity = _sentiment_polarity(original)
+            comment_polarity = _sentiment_polarity(comment)
+            edited_polarity = _sentiment_polarity(edited)
             
-            features['sentiment_change'] = edited_sentiment.polarity - original_sentiment.polarity
-            features['comment_sentiment'] = comment_sentiment.polarity
-            features['sentiment_alignment'] = abs(edited_sentiment.polarity - comment_sentiment.polarity)
+            features['sentiment_change'] = edited_polarity - original_polarity
+            features['comment_sentiment'] = comment_polarity
+            features['sentiment_alignment'] = abs(edited_polarity - comment_polarity)
         except:
             # Fallback if TextBlob fails
             features['sentiment_change'] = 0.0
@@ -291,8 +308,8 @@ class ComplianceFeatureExtractor:
         """Extract features related to specific constraints mentioned in comments"""
         features = {}
         
-        # Detect constraints in comment
-        constraints = self.constraint_detector.detect_constraints(comment)
+        # Detect constraints in comment (cached: the same comments are checked repeatedly)
+        constraints = _comment_constraints(comment)
         
         # Basic constraint detection features
         features['has_constraints'] = len(constraints) > 0
@@ -495,9 +512,37 @@ class ComplianceClassifier:
         features = self.feature_extractor.extract_text_features(original, comment, edited)
         feature_vector = np.array([[features[name] for name in self.feature_names]])
         
-        prediction = self.model.predict(feature_vector)[0]
+        # RandomForest's predict() is itself an argmax over predict_proba(), so
+        # one predict_proba pass gives both without walking every tree twice
         probabilities = self.model.predict_proba(feature_vector)[0]
+        prediction = self.model.classes_[np.argmax(probabilities)]
         
+        return self._build_prediction(features, prediction, probabilities)
+    
+    def predict_batch(self, originals: List[str], comments: List[str], edits: List[str]) -> List[Dict]:
+        """Predict compliance for many comment-edit pairs with a single model call"""
+        if self.model is None:
+            raise ValueError("Model must be trained before making predictions")
+        if not comments:
+            return []
+        
+        features_list = [
+            self.feature_extractor.extract_text_features(original, comment, edited)
+            for original, comment, edited in zip(originals, comments, edits)
+        ]
+        feature_matrix = np.array([[features[name] for name in self.feature_names] for features in features_list])
+        
+        # One predict_proba pass for the whole batch; the predicted class is its argmax, as in predict()
+        probabilities = self.model.predict_proba(feature_matrix)
+        predictions = self.model.classes_[np.argmax(probabilities, axis=1)]
+        
+        return [
+            self._build_prediction(features, prediction, row)
+            for features, prediction, row in zip(features_list, predictions, probabilities)
+        ]
+    
+    def _build_prediction(self, features: Dict, prediction: str, probabilities) -> Dict:
+        """Turn one row of model output into a result dict, applying constraint penalties"""
         # Map probabilities to class names
         class_probs = dict(zip(self.model.classes_, probabilities))
         
@@ -527,10 +572,27 @@ class ComplianceClassifier:
         
         return base_result
     
+    def predict_with_explanation(self, original: str, comment: str, edited: str) -> Tuple[Dict, Dict]:
+        """Predict compliance and explain it from a single feature extraction"""
+        if self.model is None:
+            raise ValueError("Model must be trained before making predictions")
+        
+        features = self.feature_extractor.extract_text_features(original, comment, edited)
+        feature_vector = np.array([[features[name] for name in self.feature_names]])
+        
+        # One predict_proba pass; the predicted class is its argmax, as in predict_batch()
+        probabilities = self.model.predict_proba(feature_vector)[0]
+        prediction = self.model.classes_[np.argmax(probabilities)]
+        
+        return self._build_prediction(features, prediction, probabilities), self._build_explanation(features)
+    
     def explain_prediction(self, original: str, comment: str, edited: str) -> Dict:
         """Provide explanation for the prediction"""
         features = self.feature_extractor.extract_text_features(original, comment, edited)
-        
+        return self._build_explanation(features)
+    
+    def _build_explanation(self, features: Dict) -> Dict:
+        """Explain a prediction from its already-extracted features"""
         # Get feature importances
         feature_importance = dict(zip(self.feature_names, self.model.feature_importances_))
         
@@ -675,8 +737,18 @@ class ComplianceClassifier:
             'feature_extractor': self.feature_extractor
         }
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        with open(filepath, 'wb') as f:
-            pickle.dump(model_data, f)
+        
+        # Write beside the target and swap it in, so a failed or concurrent
+        # save never leaves a truncated pickle where load_model() reads it
+        new_path = filepath + '.new'
+        try:
+            with open(new_path, 'wb') as f:
+                pickle.dump(model_data, f)
+            os.replace(new_path, filepath)
+        except Exception:
+            if os.path.exists(new_path):
+                os.remove(new_path)
+            raise
     
     def load_model(self, filepath: str):
         """Load trained model from file"""
@@ -761,6 +833,9 @@ def retrain_model_with_comprehensive_data():
                 print(f"  - {feature}: {importance:.3f}")
         
         print(f"[SAVED] Model saved to: {model_path}")
+        
+        # Make the next get_or_create_default_model() call pick up the new model
+        get_or_create_default_model.cache_clear()
         return classifier
         
     except Exception as e:
@@ -770,8 +845,13 @@ def retrain_model_with_comprehensive_data():
         return None
 
 
+@lru_cache(maxsize=1)
 def get_or_create_default_model():
-    """Get existing model or create a new one with comprehensive training data"""
+    """Get existing model or create a new one with comprehensive training data
+
+    The classifier is loaded (or trained) once per process and reused; call
+    get_or_create_default_model.cache_clear() to force a reload.
+    """
     if not ML_DEPENDENCIES_AVAILABLE:
         print("Warning: ML dependencies not available. Cannot create ML model.")
         return None
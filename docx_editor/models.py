@@ -8,6 +8,22 @@ class Document(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
     is_editable = models.BooleanField(default=False)  # False means comment-only
     
+    PARSE_STATUS_CHOICES = [
+        ('parsing', 'Parsing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    parse_status = models.CharField(
+        max_length=10,
+        choices=PARSE_STATUS_CHOICES,
+        default='ready',
+        help_text='Whether the uploaded DOCX has been parsed into paragraphs and comments'
+    )
+    has_comments_rel = models.BooleanField(
+        default=False,
+        help_text='Whether the DOCX already relates comments.xml and registers its content type'
+    )
+    
     # Version system fields
     version_number = models.IntegerField(default=1, help_text='Version number (1, 2, 3, ...)')
     parent_document = models.ForeignKey(
@@ -98,7 +114,8 @@ class Document(models.Model):
     
     def update_status_based_on_comments(self):
         """Update version status based on comment presence"""
-        if self.has_comments() and self.version_status in ['original', 'edited']:
+        # The status test needs no query, so documents already 'commented' skip the EXISTS
+        if self.version_status in ['original', 'edited'] and self.has_comments():
             self.version_status = 'commented'
             self.comment_count = self.comments.count()
             self.save(update_fields=['version_status', 'comment_count'])
@@ -202,6 +219,12 @@ class Comment(models.Model):
         help_text="When this compliant comment is scheduled for automatic deletion (5 min delay)"
     )
     
+    class Meta:
+        indexes = [
+            # Comment lookups by (document, comment_id) and the per-document MAX(comment_id)
+            models.Index(fields=['document', 'comment_id'], name='comment_doc_id_idx'),
+        ]
+    
     def __str__(self):
         return f"Comment by {self.author}: {self.text[:30]}"
 
@@ -0,0 +1,29 @@
+from rest_framework.renderers import JSONRenderer
+
+# orjson is optional; without it the renderer is DRF's stock JSONRenderer
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson when it is installed
+    
+    Used by the compliance endpoints, which are hit on every keystroke while
+    editing. Types orjson can't encode natively (Decimal, lazy strings, ...)
+    go through DRF's own encoder, so the output matches JSONRenderer's. An
+    indent requested via the Accept header also falls back to JSONRenderer.
+    """
+    
+    _orjson_options = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if ORJSON_AVAILABLE else 0
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not ORJSON_AVAILABLE or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        
+        if data is None:
+            return b''
+        
+        return orjson.dumps(data, default=self.encoder_class().default, option=self._orjson_options)
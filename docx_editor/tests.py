@@ -1,3 +1,170 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from .views import NS, W_NS, XMLFormattingMixin, _forget_docx_file
+
+DOCUMENT_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<w:document xmlns:w="{W_NS}"><w:body>'
+    '<w:p><w:r><w:t>First</w:t></w:r></w:p>'
+    '<w:p><w:r><w:t>Second</w:t></w:r></w:p>'
+    '</w:body></w:document>'
+).encode('utf-8')
+
+
+class _Unseekable(io.RawIOBase):
+    """Write-only stream that can't seek, so zipfile writes data descriptors like streaming producers do"""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+    def flush(self):
+        pass
+
+
+def build_docx(path, members, streamed=False):
+    """Write members (name -> (bytes, compress_type)) to path as a zip archive"""
+    buffer = io.BytesIO()
+    target = _Unseekable(buffer) if streamed else buffer
+    with zipfile.ZipFile(target, 'w') as docx_zip:
+        for name, (data, compress_type) in members.items():
+            docx_zip.writestr(zipfile.ZipInfo(name, (2024, 1, 2, 3, 4, 6)), data, compress_type)
+    with open(path, 'wb') as f:
+        f.write(buffer.getvalue())
+
+
+class RewriteDocxMembersTests(SimpleTestCase):
+    """_rewrite_docx_members copies untouched members' compressed bytes straight through"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.mixin = XMLFormattingMixin()
+        self.members = {
+            '[Content_Types].xml': (b'<Types/>', zipfile.ZIP_DEFLATED),
+            'word/document.xml': (DOCUMENT_XML, zipfile.ZIP_DEFLATED),
+            'word/media/bild_ü_图.png': (os.urandom(4096), zipfile.ZIP_STORED),
+            'customXml/données.xml': (b'<r>' + b'x' * 5000 + b'</r>', zipfile.ZIP_DEFLATED),
+        }
+
+    def round_trip(self, streamed):
+        path = os.path.join(self.tmp_dir, 'round_trip.docx')
+        build_docx(path, self.members, streamed=streamed)
+        if streamed:
+            with zipfile.ZipFile(path) as docx_zip:
+                self.assertTrue(all(info.flag_bits & 0x08 for info in docx_zip.infolist()))
+
+        new_document = DOCUMENT_XML.replace(b'Second', b'Zweite')
+        self.mixin._rewrite_docx_members(path, {'word/document.xml': new_document})
+
+        with zipfile.ZipFile(path) as docx_zip:
+            self.assertIsNone(docx_zip.testzip())
+            self.assertEqual(docx_zip.namelist(), list(self.members))
+            for name, (data, compress_type) in self.members.items():
+                expected = new_document if name == 'word/document.xml' else data
+                self.assertEqual(docx_zip.read(name), expected)
+                self.assertEqual(docx_zip.getinfo(name).compress_type, compress_type)
+
+    def test_round_trip_with_data_descriptors_and_non_ascii_names(self):
+        self.round_trip(streamed=True)
+
+    def test_round_trip_without_data_descriptors(self):
+        self.round_trip(streamed=False)
+
+    def test_new_member_is_appended(self):
+        path = os.path.join(self.tmp_dir, 'append.docx')
+        build_docx(path, self.members, streamed=True)
+        self.mixin._rewrite_docx_members(path, {'word/comments.xml': b'<w:comments/>'})
+
+        with zipfile.ZipFile(path) as docx_zip:
+            self.assertIsNone(docx_zip.testzip())
+            self.assertEqual(docx_zip.namelist(), list(self.members) + ['word/comments.xml'])
+            self.assertEqual(docx_zip.read('word/comments.xml'), b'<w:comments/>')
+
+
+class DocumentCacheTests(SimpleTestCase):
+    """The per-file caches follow the file on disk and never hand out a half-edited tree"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.mixin = XMLFormattingMixin()
+        self.path = os.path.join(self.tmp_dir, 'cached.docx')
+        self.addCleanup(_forget_docx_file, self.path)
+        build_docx(self.path, {
+            '[Content_Types].xml': (b'<Types/>', zipfile.ZIP_DEFLATED),
+            'word/document.xml': (DOCUMENT_XML, zipfile.ZIP_DEFLATED),
+        })
+
+    def texts(self, root):
+        return [t.text for t in root.iterfind('.//w:t', NS)]
+
+    def set_first_text(self, text):
+        def mutate(root):
+            root.find('.//w:t', NS).text = text
+        return mutate
+
+    def test_checkout_returns_checked_in_tree_once(self):
+        self.mixin._mutate_document(self.path, self.set_first_text('Edited'))
+        
+        root = self.mixin._checkout_document_root(self.path)
+        self.assertEqual(self.texts(root), ['Edited', 'Second'])
+        # The tree is checked out, so a second editor parses its own copy
+        self.assertIsNot(self.mixin._checkout_document_root(self.path), root)
+
+    def test_replaced_file_invalidates_caches(self):
+        self.mixin._mutate_document(self.path, self.set_first_text('Edited'))
+        paragraphs = self.mixin._paragraphs_xpath(self.mixin._parse_docx_member(self.path))
+        self.assertEqual(self.mixin._text_paragraph_positions(self.path, 'all', paragraphs), [0, 1])
+        
+        # Another writer swaps in a different file under the same path
+        replacement = os.path.join(self.tmp_dir, 'replacement.docx')
+        build_docx(replacement, {
+            '[Content_Types].xml': (b'<Types/>', zipfile.ZIP_DEFLATED),
+            'word/document.xml': (DOCUMENT_XML.replace(b'Second', b'Replaced by another writer'), zipfile.ZIP_DEFLATED),
+            'word/extra.xml': (b'<extra/>', zipfile.ZIP_DEFLATED),
+        })
+        os.replace(replacement, self.path)
+        
+        root = self.mixin._checkout_document_root(self.path)
+        self.assertEqual(self.texts(root), ['First', 'Replaced by another writer'])
+        self.assertIn('word/extra.xml', [info.filename for info in self.mixin._get_zip_infos(self.path)])
+        paragraphs = self.mixin._paragraphs_xpath(root)
+        self.assertEqual(self.mixin._text_paragraph_positions(self.path, 'all', paragraphs), [0, 1])
+
+    def test_failed_mutation_drops_tree(self):
+        self.mixin._mutate_document(self.path, self.set_first_text('Edited'))
+        
+        def fail(root):
+            root.find('.//w:t', NS).text = 'Half edited'
+            raise ValueError('mutation failed')
+        
+        with self.assertRaises(ValueError):
+            self.mixin._mutate_document(self.path, fail)
+        
+        root = self.mixin._checkout_document_root(self.path)
+        self.assertEqual(self.texts(root), ['Edited', 'Second'])
+
+    def test_failed_write_drops_tree(self):
+        self.mixin._mutate_document(self.path, self.set_first_text('Edited'))
+        
+        with mock.patch.object(XMLFormattingMixin, '_rewrite_docx_members', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                self.mixin._mutate_document(self.path, self.set_first_text('Never written'))
+        
+        # The file still holds the last good edit, and so does the next checkout
+        root = self.mixin._checkout_document_root(self.path)
+        self.assertEqual(self.texts(root), ['Edited', 'Second'])
+        self.assertEqual(self.texts(self.mixin._parse_docx_member(self.path)), ['Edited', 'Second'])
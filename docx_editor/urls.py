@@ -8,6 +8,7 @@ urlpatterns = [
     path('api/documents/', views.ListDocumentsView.as_view(), name='list_documents'),
     path('api/upload/', views.UploadDocumentView.as_view(), name='upload'),
     path('api/document/<int:document_id>/', views.GetDocumentView.as_view(), name='get_document'),
+    path('api/document/<int:document_id>/status/', views.DocumentParseStatusView.as_view(), name='document_parse_status'),
     path('api/document/<int:document_id>/export/', views.ExportDocumentView.as_view(), name='export'),    
     path('api/edit_paragraph/', views.EditParagraphView.as_view(), name='edit_paragraph'),
     path('api/add_paragraph/', views.AddParagraphView.as_view(), name='add_paragraph'),
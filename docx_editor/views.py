@@ -1,347 +1,924 @@
+import bisect
+import json
+import logging
 import os
+import posixpath
+import re
 import shutil
+import struct
+import tempfile
+import threading
 import uuid
-import xml.etree.ElementTree as ET
 import zipfile
-from datetime import datetime
+import zlib
+from collections import OrderedDict
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from datetime import datetime, timedelta
+from functools import lru_cache
+from html import unescape
+from io import BytesIO
+from xml.sax.saxutils import escape, quoteattr
 from django.conf import settings
-from django.db.models import Count, Q
-from django.http import FileResponse
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Max, Q
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, StreamingHttpResponse
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from rest_framework import status
+from rest_framework.exceptions import ParseError, UnsupportedMediaType
+from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from docx import Document as DocxDocument
+from filelock import FileLock
+from lxml import etree
+from .docx_parser import EnhancedDocxParser
 from .models import Document, Paragraph, Comment, DocumentImage, ParagraphImage
+from .renderers import FastJSONRenderer
 from .serializers import DocumentSerializer
 
+# WordprocessingML namespace and the Clark-notation names looked up on hot paths
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+NS = {'w': W_NS}
+W = '{%s}' % W_NS
+W_ID = W + 'id'
+W_AUTHOR = W + 'author'
+W_DATE = W + 'date'
+BODY_TAG = W + 'body'
+P_TAG = W + 'p'
+R_TAG = W + 'r'
+T_TAG = W + 't'
+COMMENT_TAG = W + 'comment'
+COMMENT_RANGE_START_TAG = W + 'commentRangeStart'
+COMMENT_RANGE_END_TAG = W + 'commentRangeEnd'
+COMMENT_REFERENCE_TAG = W + 'commentReference'
+SPACE_ATTR = '{http://www.w3.org/XML/1998/namespace}space'
+# Package-level parts: document.xml.rels and [Content_Types].xml
+RELS_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+REL_TAG = '{%s}Relationship' % RELS_NS
+COMMENTS_REL_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments'
+CT_NS = 'http://schemas.openxmlformats.org/package/2006/content-types'
+CT_OVERRIDE_TAG = '{%s}Override' % CT_NS
+COMMENTS_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml'
+# Read size for streamed downloads; Django's FileResponse default is 4 KiB.
+# WSGI servers with wsgi.file_wrapper bypass this and use sendfile().
+FILE_RESPONSE_BLOCK_SIZE = 64 * 1024
+
+# Deflate level for the parts a rewrite has to encode. Only small XML parts
+# change per edit, and level 1 is several times faster than zlib's default 6
+# for a few percent in size
+DOCX_COMPRESS_LEVEL = 1
+
+# Media that is already compressed; whenever such a member has to be written
+# rather than copied raw it is stored, since deflate can't shrink it further
+STORED_MEDIA_EXTENSIONS = frozenset(('.png', '.jpg', '.jpeg', '.gif', '.woff', '.woff2'))
+
+# Strips tags from stored paragraph HTML when a DOCX is rebuilt from the database
+HTML_TAG_RE = re.compile('<[^<]+?>')
+# Numbered relationship ids (rId7); any other Id format is left out of the max
+REL_ID_RE = re.compile(r'rId([0-9]+)')
+XML_DECLARATION = b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+# A document.xml.rels written from scratch: the fixed header and footer around its entries
+RELS_HEADER = XML_DECLARATION + b'<Relationships xmlns="' + RELS_NS.encode() + b'">'
+RELS_FOOTER = b'</Relationships>'
+# The comments entry, filled in with its rId number
+COMMENTS_REL_XML = b'<Relationship Id="rId%%d" Type="%s" Target="comments.xml"/>' % COMMENTS_REL_TYPE.encode()
+
+# Shared lxml parser for package parts: drops indentation-only text nodes
+# (whitespace inside <w:t> is content and is kept), skips the xml:id table
+# nothing here reads, and never expands entities
+XML_PARSER = etree.XMLParser(remove_blank_text=True, collect_ids=False, resolve_entities=False)
+
+logger = logging.getLogger(__name__)
+
+# Temporary paragraph_id offset used while renumbering under unique_together
+RENUMBER_OFFSET = 1000000
+
+# Every change to a DOCX runs inline in the request (or command) that makes it,
+# holding an OS-level lock on a '<path>.lock' file next to the document. The
+# lock is shared by all threads, server worker processes and management
+# commands, so no two writers ever replace the same file at once. A write that
+# can't get the lock within DOCX_LOCK_TIMEOUT seconds fails like any other
+DOCX_LOCK_SUFFIX = '.lock'
+DOCX_LOCK_TIMEOUT = 60
+
+# Uploads sent with ?background=true are parsed here after the response;
+# clients poll the document's status endpoint until it is 'ready'
+_upload_parser_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='docx-parser')
+
+
+# The three per-file caches below are bounded LRUs of _FILE_CACHE_SIZE entries
+# each, read and written through _file_cache_get and _file_cache_put
+
+# Central directory of each DOCX, keyed by path and reused until the file changes:
+# file_path -> ((st_mtime_ns, st_size), [ZipInfo, ...])
+_ZIP_DIR_CACHE = OrderedDict()
+
+# Positions of the text-bearing <w:p> elements (the ones paragraph_id counts),
+# so edits index straight to paragraph N instead of re-joining every
+# paragraph's text: (file_path, scope) -> ((st_mtime_ns, st_size), [index, ...])
+_PARAGRAPH_INDEX_CACHE = OrderedDict()
+
+# Files already known to carry the comments relationship and content type, so
+# later comment adds skip reading and parsing those two parts:
+# file_path -> (st_mtime_ns, st_size) as of the last write. Rewrites that leave
+# both parts alone carry the entry over to the new file
+_COMMENTS_WIRED_CACHE = OrderedDict()
+
+_FILE_CACHE_SIZE = 64
+_file_cache_lock = threading.Lock()
+
+# Parsed document.xml of recently edited files, so a run of edits to the same
+# document parses it once. A mutator checks the tree out (removes it) while it
+# edits and puts it back only after the rewritten archive is in place, so a
+# failed write never leaves a half-edited tree behind. Bounded LRU:
+# file_path -> ((st_mtime_ns, st_size), root)
+_DOCUMENT_TREE_CACHE = OrderedDict()
+_DOCUMENT_TREE_CACHE_SIZE = 32
+_document_tree_lock = threading.Lock()
+
+
+def _file_cache_get(cache, key):
+    """Return cache[key] or None, marking the entry as recently used"""
+    with _file_cache_lock:
+        entry = cache.get(key)
+        if entry is not None:
+            cache.move_to_end(key)
+        return entry
+
+
+def _file_cache_put(cache, key, entry):
+    """Store cache[key], evicting the least recently used entries past _FILE_CACHE_SIZE"""
+    with _file_cache_lock:
+        cache[key] = entry
+        cache.move_to_end(key)
+        while len(cache) > _FILE_CACHE_SIZE:
+            cache.popitem(last=False)
+
+
+def _forget_docx_file(file_path):
+    """Drop every cached entry for file_path, e.g. once its document is archived"""
+    with _file_cache_lock:
+        _ZIP_DIR_CACHE.pop(file_path, None)
+        _COMMENTS_WIRED_CACHE.pop(file_path, None)
+        for scope in ('all', 'body'):
+            _PARAGRAPH_INDEX_CACHE.pop((file_path, scope), None)
+    with _document_tree_lock:
+        _DOCUMENT_TREE_CACHE.pop(file_path, None)
+
+
+@lru_cache(maxsize=256)
+def _validate_docx(path, mtime, size):
+    """Return (has_document_xml, file_count) for a DOCX.
+
+    mtime and size are part of the cache key only, so a changed file is
+    re-read while repeated exports of the same file are free.
+    """
+    with zipfile.ZipFile(path, 'r') as docx_zip:
+        # getinfo is a dict lookup; infolist() hands back the parsed list without copying
+        try:
+            docx_zip.getinfo('word/document.xml')
+            has_document_xml = True
+        except KeyError:
+            has_document_xml = False
+        return has_document_xml, len(docx_zip.infolist())
+
+
+def _copy_file(source_path, target_path):
+    """Copy file data in the kernel with copy_file_range, falling back to shutil.copyfile.
+
+    On CoW filesystems (btrfs, XFS) copy_file_range can share extents instead
+    of moving bytes. Older kernels and cross-device copies raise OSError and
+    take the copyfile path; no metadata is copied either way.
+    """
+    copy_file_range = getattr(os, 'copy_file_range', None)
+    if copy_file_range is not None:
+        try:
+            with open(source_path, 'rb') as src, open(target_path, 'wb') as dst:
+                remaining = os.fstat(src.fileno()).st_size
+                while remaining > 0:
+                    copied = copy_file_range(src.fileno(), dst.fileno(), remaining)
+                    if not copied:
+                        break
+                    remaining -= copied
+            return
+        except OSError:
+            pass
+    shutil.copyfile(source_path, target_path)
+
+
+def _open_replacement(path):
+    """Open a uniquely named temporary file next to path, to be swapped in with os.replace.
+
+    Writers to one path are serialized by its DOCX lock (_run_docx_write); the
+    unique name keeps a crashed writer's leftover temp file out of the next
+    write's way. The original's permission bits are carried over, since
+    mkstemp creates the file owner-only. Returns (file object, temp path).
+    """
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or '.', prefix=name + '.', suffix='.new')
+    try:
+        try:
+            shutil.copymode(path, tmp_path)
+        except FileNotFoundError:
+            pass
+        return os.fdopen(fd, 'wb'), tmp_path
+    except Exception:
+        os.close(fd)
+        os.remove(tmp_path)
+        raise
+
+
+def _compact_json_dumps(data):
+    """JSON text in the same compact, non-ASCII-escaped form DRF's JSONRenderer emits"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def _stream_json_items(items, chunk_size):
+    """Yield comma-separated JSON for items, one chunk per chunk_size items"""
+    batch = []
+    separator = ''
+    for item in items:
+        batch.append(_compact_json_dumps(item))
+        if len(batch) == chunk_size:
+            yield separator + ','.join(batch)
+            separator = ','
+            batch = []
+    if batch:
+        yield separator + ','.join(batch)
+
+
+def parse_pending_response(parse_status):
+    """409 response for a document whose upload is still parsing or failed to parse; None once it is ready"""
+    if parse_status == 'ready':
+        return None
+    return Response({
+        'error': f'Document is not ready (parse status: {parse_status})',
+        'parse_status': parse_status
+    }, status=status.HTTP_409_CONFLICT)
+
+
+def copy_paragraphs_to_version(source, new_version):
+    """Copy source's paragraphs and their image links onto new_version.
+
+    The images come in with one prefetch query and both kinds of row are
+    bulk-inserted. The DocumentImage rows themselves are shared across
+    versions, so only the ParagraphImage links are copied.
+    """
+    current_paragraphs = list(
+        source.paragraphs.order_by('paragraph_id').prefetch_related('paragraph_images')
+    )
+    new_paragraphs = Paragraph.objects.bulk_create([
+        Paragraph(
+            document=new_version,
+            paragraph_id=old_paragraph.paragraph_id,
+            text=old_paragraph.text,
+            html_content=old_paragraph.html_content,
+            has_images=old_paragraph.has_images
+        )
+        for old_paragraph in current_paragraphs
+    ], batch_size=500)
+    
+    ParagraphImage.objects.bulk_create([
+        ParagraphImage(
+            paragraph=new_paragraph,
+            document_image_id=para_image.document_image_id,
+            position_in_paragraph=para_image.position_in_paragraph
+        )
+        for old_paragraph, new_paragraph in zip(current_paragraphs, new_paragraphs)
+        for para_image in old_paragraph.paragraph_images.all()
+    ], batch_size=500)
+
+
+def paragraph_payloads(document, chunk_size=1000):
+    """Yield each paragraph of document as its response dict, in paragraph_id order.
+
+    Rows come back from values() as plain dicts, so no Paragraph instance is
+    built per row. The images of the whole document are read up front in one
+    query and attached by paragraph; paragraphs are then streamed chunk_size
+    rows at a time.
+    """
+    images_by_paragraph = {}
+    image_rows = ParagraphImage.objects.filter(
+        paragraph__document=document, paragraph__has_images=True
+    ).values(
+        'paragraph', 'document_image_id', 'document_image__filename',
+        'document_image__image_id', 'position_in_paragraph'
+    )
+    for row in image_rows:
+        images_by_paragraph.setdefault(row['paragraph'], []).append({
+            'id': row['document_image_id'],
+            'filename': row['document_image__filename'],
+            'image_id': row['document_image__image_id'],
+            'position': row['position_in_paragraph']
+        })
+    
+    paragraphs = Paragraph.objects.filter(document=document).order_by('paragraph_id').values(
+        'id', 'paragraph_id', 'text', 'html_content', 'has_images'
+    )
+    for para in paragraphs.iterator(chunk_size=chunk_size):
+        para_data = {
+            'id': para['paragraph_id'],
+            'text': para['text'],
+            'html_content': para['html_content'],
+            'has_images': para['has_images']
+        }
+        
+        # Add image information if paragraph has images
+        if para['has_images']:
+            para_data['images'] = images_by_paragraph.get(para['id'], [])
+        
+        yield para_data
+
+
+def _compress_type_for(name, default=zipfile.ZIP_DEFLATED):
+    """Pick the compression method for a member that is being (re)encoded"""
+    if posixpath.splitext(name)[1].lower() in STORED_MEDIA_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return default
+
+
+def _needs_space_preserve(text):
+    """True when text has leading or trailing whitespace that <w:t> must keep via xml:space.
+
+    Only the two end characters are looked at, instead of comparing text
+    against a stripped copy of itself.
+    """
+    return text[:1].isspace() or text[-1:].isspace()
+
+
+def _docx_file_lock(file_path):
+    """The cross-process lock guarding writes to file_path"""
+    return FileLock(file_path + DOCX_LOCK_SUFFIX, timeout=DOCX_LOCK_TIMEOUT)
+
+
+def _run_docx_write(func, file_path, *args, **kwargs):
+    """Run func(file_path, ...) holding file_path's DOCX lock and return its result.
+
+    Errors (including a lock timeout) are raised to the caller, which reports
+    them in its response.
+    """
+    with _docx_file_lock(file_path):
+        return func(file_path, *args, **kwargs)
+
+
+def _wait_for_docx_writes(file_path):
+    """Block until a write in progress on file_path, in any process, has finished"""
+    try:
+        with _docx_file_lock(file_path):
+            pass
+    except OSError:
+        # No lock file can be made (e.g. the directory is gone), so no writer holds one
+        pass
+
+
+def _replace_file_bytes(file_path, data):
+    """Swap data in as file_path's contents through a synced sibling file"""
+    f, tmp_path = _open_replacement(file_path)
+    try:
+        with f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 
 class XMLFormattingMixin:
     """Mixin class providing XML formatting methods for DOCX processing"""
     
-    def _write_xml_with_proper_formatting(self, tree, file_path):
-        """Write XML with proper formatting to avoid corruption"""
+    # Compiled once at class scope. Comment ids are bound as the $cid XPath
+    # variable rather than formatted into the expression
+    _paragraphs_xpath = etree.XPath('.//w:p', namespaces=NS)
+    # True when any <w:t> holds non-whitespace. normalize-space() only trims XML
+    # whitespace, so the other characters str.strip() drops (NBSP, em space, ...)
+    # are mapped to spaces first and paragraph numbering matches the parser's.
+    # In a boolean context libxml2 stops at the first matching <w:t>
+    _paragraph_has_text_xpath = etree.XPath(
+        "boolean(.//w:t[normalize-space(translate(., '%s', '%s'))])" % (
+            '\x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006'
+            '\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000',
+            ' ' * 19,
+        ),
+        namespaces=NS,
+    )
+    _comment_by_id_xpath = etree.XPath('w:comment[@w:id = $cid]', namespaces=NS)
+    _comment_markers_xpath = etree.XPath(
+        '//w:commentRangeStart[@w:id = $cid] | //w:commentRangeEnd[@w:id = $cid]'
+        ' | //w:commentReference[@w:id = $cid]',
+        namespaces=NS,
+    )
+    _comments_override_xpath = etree.XPath(
+        ".//ct:Override[@PartName='/word/comments.xml']", namespaces={'ct': CT_NS}
+    )
+
+    def _copy_member_raw(self, raw_in, docx_out, info):
+        """Copy a member's compressed payload from the raw archive file raw_in into docx_out as-is.
+
+        The CRC and sizes recorded in the source central directory are reused,
+        so the data is never inflated, deflated or checksummed again.
+        """
+        # Local file header: 30 fixed bytes, then the name and extra field
+        raw_in.seek(info.header_offset)
+        header = raw_in.read(30)
+        name_length, extra_length = struct.unpack('<HH', header[26:30])
+        raw_in.seek(info.header_offset + 30 + name_length + extra_length)
+        
+        out_info = self._member_info(info)
+        out_info.CRC = info.CRC
+        out_info.compress_size = info.compress_size
+        out_info.file_size = info.file_size
+        
+        docx_out.fp.seek(docx_out.start_dir)
+        out_info.header_offset = docx_out.fp.tell()
+        docx_out.fp.write(out_info.FileHeader())
+        
+        remaining = info.compress_size
+        while remaining:
+            chunk = raw_in.read(min(remaining, 1024 * 1024))
+            if not chunk:
+                raise zipfile.BadZipFile(f"Truncated member {info.filename}")
+            docx_out.fp.write(chunk)
+            remaining -= len(chunk)
+        
+        docx_out.filelist.append(out_info)
+        docx_out.NameToInfo[out_info.filename] = out_info
+        docx_out.start_dir = docx_out.fp.tell()
+
+    def _member_info(self, info):
+        """Return a fresh ZipInfo carrying over a member's name, timestamp, compression and attributes"""
+        out_info = zipfile.ZipInfo(info.filename, info.date_time)
+        out_info.compress_type = info.compress_type
+        out_info.create_system = info.create_system
+        out_info.external_attr = info.external_attr
+        return out_info
+
+    def _rewrite_docx_members(self, file_path, modified_members):
+        """Rewrite the DOCX archive replacing only the given members.
+
+        modified_members maps archive names to their new XML bytes. Every other
+        member's compressed bytes are copied through from the original archive
+        untouched, in their original order, reusing the stored CRC. Replaced
+        members keep the original entry's compression method and metadata. A "modified"
+        member whose bytes match the stored size and CRC is copied the same way
+        instead of being deflated again; zlib.crc32 is hardware-accelerated in
+        current CPython builds, so that check is far cheaper than deflate. The new archive is built next to the
+        original and swapped in with os.replace, so a failure never leaves a
+        partial file.
+        
+        The source's central directory comes from _ZIP_DIR_CACHE, and the new
+        archive's directory is stored there once it is swapped in, so a run of
+        edits never re-parses it. The same goes for the _COMMENTS_WIRED_CACHE
+        entry when the rels and content types parts are left alone. Returns the
+        new file's key, taken from the descriptor just written rather than by
+        stat-ing the path after the swap.
+        """
+        source_key = self._file_key(file_path)
+        keeps_wiring = not any(
+            name in modified_members
+            for name in ('word/_rels/document.xml.rels', '[Content_Types].xml')
+        )
+        raw_out, tmp_path = _open_replacement(file_path)
+        pending = dict(modified_members)
+        docx_in = None
+        
         try:
-            import xml.dom.minidom
-            
-            # First write to get XML content
-            rough_string = ET.tostring(tree.getroot(), encoding='unicode')
-            
-            # Add proper XML declaration for Word compatibility
-            xml_content = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' + rough_string
-            
-            # Parse and prettify with minidom
-            dom = xml.dom.minidom.parseString(xml_content.encode('utf-8'))
-            pretty_xml = dom.toprettyxml(indent="  ", encoding='utf-8').decode('utf-8')
-            
-            # Clean up extra blank lines that minidom adds
-            lines = [line for line in pretty_xml.split('\n') if line.strip()]
-            clean_pretty_xml = '\n'.join(lines)
-            
-            # Ensure XML declaration is Word-compatible
-            if clean_pretty_xml.startswith('<?xml version="1.0" encoding="utf-8"?>'):
-                clean_pretty_xml = clean_pretty_xml.replace(
-                    '<?xml version="1.0" encoding="utf-8"?>',
-                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
-                )
-            elif clean_pretty_xml.startswith('<?xml version="1.0"?>'):
-                clean_pretty_xml = clean_pretty_xml.replace(
-                    '<?xml version="1.0"?>',
-                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
-                )
-            
-            # Write the properly formatted XML
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(clean_pretty_xml)
+            with open(file_path, 'rb') as raw_in, raw_out:
+                infos = self._get_zip_infos(file_path, raw_in)
+                with zipfile.ZipFile(raw_out, 'w', zipfile.ZIP_DEFLATED, compresslevel=DOCX_COMPRESS_LEVEL) as docx_out:
+                    for info in infos:
+                        data = pending.pop(info.filename, None)
+                        if data is not None and not (
+                            len(data) == info.file_size and zlib.crc32(data) == info.CRC
+                        ):
+                            # The member keeps its original compression method, timestamp
+                            # and attributes. A ZipInfo doesn't pick up the archive's
+                            # compresslevel, so the level is passed explicitly
+                            out_info = self._member_info(info)
+                            out_info.compress_type = _compress_type_for(info.filename, info.compress_type)
+                            docx_out.writestr(out_info, data, compresslevel=DOCX_COMPRESS_LEVEL)
+                        elif info.flag_bits & 0x1:
+                            # Encrypted members can't be copied raw; only they need
+                            # the source opened as an archive
+                            if docx_in is None:
+                                docx_in = zipfile.ZipFile(raw_in, 'r')
+                            out_info = self._member_info(info)
+                            out_info.compress_type = _compress_type_for(info.filename, info.compress_type)
+                            with docx_in.open(info) as src, docx_out.open(out_info, 'w') as dst:
+                                shutil.copyfileobj(src, dst)
+                        else:
+                            self._copy_member_raw(raw_in, docx_out, info)
                 
-            # Verify the written XML is valid
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                ET.fromstring(content.encode('utf-8'))
-                print(f"Successfully wrote Word-compatible XML to {os.path.basename(file_path)}")
-            except ET.ParseError as e:
-                print(f"Warning: Generated XML may be malformed in {file_path}: {e}")
-                    
-        except Exception as e:
-            print(f"Error formatting XML for {file_path}: {e}")
-            print("Falling back to basic XML writing...")
-            # Fallback to basic writing
-            tree.write(file_path, encoding='utf-8', xml_declaration=True)
+                    # Members that didn't exist in the original archive
+                    for name, data in pending.items():
+                        docx_out.writestr(name, data, _compress_type_for(name))
+                
+                # The central directory is written when the archive closes; sync
+                # the finished file before it replaces the original
+                raw_out.flush()
+                os.fsync(raw_out.fileno())
+                stat = os.fstat(raw_out.fileno())
+                file_key = (stat.st_mtime_ns, stat.st_size)
+                if docx_in is not None:
+                    docx_in.close()
+            
+            os.replace(tmp_path, file_path)
+            _file_cache_put(_ZIP_DIR_CACHE, file_path, (file_key, docx_out.infolist()))
+            if keeps_wiring and _file_cache_get(_COMMENTS_WIRED_CACHE, file_path) == source_key:
+                _file_cache_put(_COMMENTS_WIRED_CACHE, file_path, file_key)
+            return file_key
+            
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _clone_docx(self, source_path, target_path):
+        """Give target_path the contents of source_path without copying bytes where possible.
 
-    def _format_xml_file(self, file_path):
-        """Format an existing XML file to have proper indentation"""
+        Every writer here swaps in a new file with os.replace rather than
+        writing into the existing one, so a hard link shares data only until
+        either side is edited; the edit then lands in a fresh inode. Falls back
+        to an in-kernel data copy (_copy_file) across filesystems or where links
+        are unsupported.
+        """
+        # os.link needs a name that doesn't exist yet, so the temp name is random
+        # rather than created by mkstemp
+        tmp_path = f'{target_path}.{uuid.uuid4().hex}.new'
         try:
-            import xml.dom.minidom
-            
-            # Read the existing XML
-            with open(file_path, 'r', encoding='utf-8') as f:
-                xml_content = f.read()
-            
-            # Parse and prettify
-            dom = xml.dom.minidom.parseString(xml_content.encode('utf-8'))
-            pretty_xml = dom.toprettyxml(indent="  ", encoding='utf-8').decode('utf-8')
-            
-            # Clean up extra blank lines
-            lines = [line for line in pretty_xml.split('\n') if line.strip()]
-            clean_pretty_xml = '\n'.join(lines)
-            
-            # Ensure XML declaration is Word-compatible
-            if clean_pretty_xml.startswith('<?xml version="1.0" encoding="utf-8"?>'):
-                clean_pretty_xml = clean_pretty_xml.replace(
-                    '<?xml version="1.0" encoding="utf-8"?>',
-                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
-                )
-            elif clean_pretty_xml.startswith('<?xml version="1.0"?>'):
-                clean_pretty_xml = clean_pretty_xml.replace(
-                    '<?xml version="1.0"?>',
-                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
-                )
-            
-            # Write back the formatted XML
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(clean_pretty_xml)
-                
-            return True
-            
-        except Exception as e:
-            print(f"Error formatting {file_path}: {e}")
-            return False
+            try:
+                os.link(source_path, tmp_path)
+            except OSError:
+                _copy_file(source_path, tmp_path)
+            os.replace(tmp_path, target_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _write_docx_after_commit(self, func, file_path, *args):
+        """Apply a DOCX change for an edit the database has already committed.
 
-    def _recreate_docx_with_proper_xml_formatting(self, file_path, temp_dir):
-        """Recreate DOCX ensuring all XML files are properly formatted"""
+        The database is authoritative, so a failed file write doesn't fail the
+        request; it comes back as (docx_success, docx_error) for the response.
+        """
         try:
-            import xml.dom.minidom
-            
-            print("Formatting all XML files for Word compatibility...")
-            
-            # Find all XML files in the temp directory
-            xml_files = []
-            for root, dirs, files in os.walk(temp_dir):
-                for file in files:
-                    if file.endswith('.xml'):
-                        xml_files.append(os.path.join(root, file))
-            
-            print(f"Found {len(xml_files)} XML files to format")
-            
-            # Format each XML file
-            for xml_file in xml_files:
-                rel_path = os.path.relpath(xml_file, temp_dir).replace('\\', '/')
-                
-                # Check if file was already formatted by checking if it has proper indentation
-                try:
-                    with open(xml_file, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    # Check if already properly formatted (has multiple lines and indentation)
-                    if content.count('\n') > 5 and ('  <' in content or '    <' in content):
-                        print(f"  {rel_path}: Already properly formatted")
-                        continue
-                    
-                    # Format the file
-                    success = self._format_xml_file(xml_file)
-                    if success:
-                        print(f"  {rel_path}: Formatted successfully")
-                    else:
-                        print(f"  {rel_path}: Formatting failed, kept original")
-                        
-                except Exception as e:
-                    print(f"  {rel_path}: Error checking/formatting - {e}")
-            
-            print("Recreating DOCX with formatted XML files...")
-            
-            # Recreate the DOCX file
-            with zipfile.ZipFile(file_path, 'w', zipfile.ZIP_DEFLATED) as docx_out:
-                for root, dirs, files in os.walk(temp_dir):
-                    for file in files:
-                        file_path_full = os.path.join(root, file)
-                        # Use forward slashes for archive names (ZIP standard)
-                        archive_name = os.path.relpath(file_path_full, temp_dir).replace('\\', '/')
-                        docx_out.write(file_path_full, archive_name)
-            
-            print("DOCX recreation completed with properly formatted XML")
-            return True
-            
+            _run_docx_write(func, file_path, *args)
         except Exception as e:
-            print(f"Error recreating DOCX with proper XML formatting: {e}")
-            return False
+            logger.exception("Could not update DOCX file %s", file_path)
+            return False, str(e)
+        return True, None
+
+    def _file_key(self, file_path):
+        """Identify the current contents of a file for the per-path caches"""
+        stat = os.stat(file_path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _text_paragraph_positions(self, file_path, scope, paragraphs):
+        """Return the indices in paragraphs of those with text, cached until the file changes.
+
+        scope names which paragraph list was scanned ('all' descendants or
+        'body' children), since the two numberings differ.
+        """
+        file_key = self._file_key(file_path)
+        cached = _file_cache_get(_PARAGRAPH_INDEX_CACHE, (file_path, scope))
+        if cached is not None and cached[0] == file_key:
+            return cached[1]
+        
+        # Each paragraph's test ends at its first non-blank <w:t>; no text is joined
+        has_text = self._paragraph_has_text_xpath
+        positions = [i for i, para in enumerate(paragraphs) if has_text(para)]
+        _file_cache_put(_PARAGRAPH_INDEX_CACHE, (file_path, scope), (file_key, positions))
+        return positions
+
+    def _store_paragraph_positions(self, file_path, scope, positions):
+        """Carry paragraph positions over to the file just rewritten"""
+        _file_cache_put(_PARAGRAPH_INDEX_CACHE, (file_path, scope), (self._file_key(file_path), positions))
+
+    def _checkout_document_root(self, file_path):
+        """Return document.xml parsed for editing, reusing the tree from the last edit if the file is unchanged"""
+        file_key = self._file_key(file_path)
+        with _document_tree_lock:
+            cached = _DOCUMENT_TREE_CACHE.pop(file_path, None)
+        if cached is not None and cached[0] == file_key:
+            return cached[1]
+        return self._parse_docx_member(file_path, 'word/document.xml')
+
+    def _checkin_document_root(self, file_path, root, file_key):
+        """Keep an edited document.xml tree for the next edit, keyed to the file just written.
+
+        file_key is the key _rewrite_docx_members took from the written file, so
+        a later replacement of the path can't end up cached under this tree.
+        """
+        entry = (file_key, root)
+        with _document_tree_lock:
+            _DOCUMENT_TREE_CACHE[file_path] = entry
+            _DOCUMENT_TREE_CACHE.move_to_end(file_path)
+            while len(_DOCUMENT_TREE_CACHE) > _DOCUMENT_TREE_CACHE_SIZE:
+                _DOCUMENT_TREE_CACHE.popitem(last=False)
+
+    def _mutate_document(self, file_path, mutate, other_members=None):
+        """Apply mutate(root) to document.xml and write the result back to the archive.
+
+        The tree comes from _checkout_document_root and goes back with
+        _checkin_document_root once the file is rewritten. other_members
+        (member name -> bytes) are swapped in by the same rewrite. Returns
+        whatever mutate returns. If mutate raises, nothing is written and the
+        tree is dropped rather than cached half-edited.
+        """
+        root = self._checkout_document_root(file_path)
+        result = mutate(root)
+        modified_members = {'word/document.xml': self._serialize_xml(root)}
+        if other_members:
+            modified_members.update(other_members)
+        file_key = self._rewrite_docx_members(file_path, modified_members)
+        self._checkin_document_root(file_path, root, file_key)
+        return result
+
+    def _get_zip_infos(self, file_path, raw_file=None):
+        """Return the archive's ZipInfo list, re-reading it only when the file changed.
+
+        Opening the archive parses the central directory, which is enough to
+        reject a file that is not a valid zip; no per-member CRC pass is done.
+        With raw_file (an open binary handle on file_path) the cache is checked
+        against that handle, so the list always matches the bytes being read.
+        """
+        if raw_file is not None:
+            stat = os.fstat(raw_file.fileno())
+            key = (stat.st_mtime_ns, stat.st_size)
+        else:
+            key = self._file_key(file_path)
+        cached = _file_cache_get(_ZIP_DIR_CACHE, file_path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        with zipfile.ZipFile(raw_file if raw_file is not None else file_path, 'r') as docx_zip:
+            infos = docx_zip.infolist()
+        _file_cache_put(_ZIP_DIR_CACHE, file_path, (key, infos))
+        return infos
+
+    def _parse_docx_member(self, file_path, member='word/document.xml'):
+        """Parse one XML part straight out of the DOCX archive, without extracting it.
+
+        lxml reads the member's decompressing stream directly, so the part is
+        never held as one bytes object next to its tree.
+        """
+        with zipfile.ZipFile(file_path, 'r') as docx_zip:
+            if member not in docx_zip.NameToInfo:
+                raise Exception(f"{member} not found in {file_path}")
+            with docx_zip.open(member) as part:
+                return etree.parse(part, XML_PARSER).getroot()
+
+    def _serialize_xml(self, root):
+        """Serialize an XML part to bytes with the declaration Word expects.
+
+        lxml trees are written by libxml2's serializer, declaration included, in
+        a single C pass. Output is not pretty-printed: Word doesn't need the
+        indentation and it would only grow every part that is rewritten.
+        """
+        return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
 
     def delete_comment_from_docx(self, file_path, comment_id):
         """Delete a comment from the DOCX file"""
-        backup_path = None
-        temp_dir = None
+        modified_members = {}
         
-        try:
-            # Create a backup
-            backup_path = file_path + '.backup'
-            shutil.copy2(file_path, backup_path)
-            
-            # Extract the DOCX
-            temp_dir = file_path + '_temp'
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-                
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
+        with zipfile.ZipFile(file_path, 'r') as zip_ref:
+            # Membership checks go straight to the central-directory index
+            member_names = zip_ref.NameToInfo
             
             # Update comments.xml
-            comments_path = os.path.join(temp_dir, 'word', 'comments.xml')
-            
-            if os.path.exists(comments_path):
-                ET.register_namespace('w', 'http://schemas.openxmlformats.org/wordprocessingml/2006/main')
-                
-                tree = ET.parse(comments_path)
-                root = tree.getroot()
-                
-                namespaces = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
+            if 'word/comments.xml' in member_names:
+                with zip_ref.open('word/comments.xml') as part:
+                    root = etree.parse(part, XML_PARSER).getroot()
                 
                 # Find and remove the comment
-                comments = root.findall('.//w:comment', namespaces)
-                for comment in comments:
-                    if comment.get('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id') == str(comment_id):
-                        root.remove(comment)
-                        break
+                for comment in self._comment_by_id_xpath(root, cid=str(comment_id))[:1]:
+                    root.remove(comment)
                 
-                self._write_xml_with_proper_formatting(tree, comments_path)
+                modified_members['word/comments.xml'] = self._serialize_xml(root)
             
             # Remove comment references from document.xml
-            self.remove_comment_references_from_document(temp_dir, comment_id)
-            
-            # Recreate the DOCX file with proper XML formatting for ALL files
-            self._recreate_docx_with_proper_xml_formatting(file_path, temp_dir)
-            
-            # Cleanup
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-            if backup_path and os.path.exists(backup_path):
-                os.remove(backup_path)
-                
-        except Exception as e:
-            # Restore backup if something went wrong
-            if backup_path and os.path.exists(backup_path):
-                shutil.copy2(backup_path, file_path)
-                os.remove(backup_path)
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-            raise e
-
-    def remove_comment_references_from_document(self, temp_dir, comment_id):
-        """Remove comment references from document.xml"""
-        document_path = os.path.join(temp_dir, 'word', 'document.xml')
-        
-        if not os.path.exists(document_path):
-            return
-        
-        ET.register_namespace('w', 'http://schemas.openxmlformats.org/wordprocessingml/2006/main')
-        
-        tree = ET.parse(document_path)
-        root = tree.getroot()
-        
-        namespaces = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
-        
-        # Create parent map for efficient parent lookup
-        parent_map = {child: parent for parent in root.iter() for child in parent}
+            if 'word/document.xml' in member_names:
+                with zip_ref.open('word/document.xml') as part:
+                    root = etree.parse(part, XML_PARSER).getroot()
+                self.remove_comment_references_from_document(root, comment_id)
+                modified_members['word/document.xml'] = self._serialize_xml(root)
         
-        # Helper function to remove elements using parent map
-        def remove_elements_by_xpath(xpath_pattern):
-            elements_to_remove = root.findall(xpath_pattern, namespaces)
-            for element in elements_to_remove:
-                parent = parent_map.get(element)
-                if parent is not None:
-                    parent.remove(element)
-        
-        # Remove comment range starts
-        remove_elements_by_xpath(f'.//w:commentRangeStart[@w:id="{comment_id}"]')
-        
-        # Remove comment range ends  
-        remove_elements_by_xpath(f'.//w:commentRangeEnd[@w:id="{comment_id}"]')
-        
-        # Remove comment references
-        remove_elements_by_xpath(f'.//w:commentReference[@w:id="{comment_id}"]')
-        
-        self._write_xml_with_proper_formatting(tree, document_path)
+        # Only the two edited parts are replaced, everything else is streamed through.
+        # The original file stays intact until the rewritten archive is swapped in.
+        self._rewrite_docx_members(file_path, modified_members)
+
+    def remove_comment_references_from_document(self, root, comment_id):
+        """Remove comment range markers and references from a parsed document.xml root"""
+        # XPath returns a list, so the tree isn't mutated while it is being searched
+        for marker in self._comment_markers_xpath(root, cid=str(comment_id)):
+            marker.getparent().remove(marker)
 
 
 class UploadDocumentView(APIView):
     parser_classes = [MultiPartParser]
+    # Compiled once at class scope, like the mixin's XPaths. The text is only
+    # joined, so plain strings are returned instead of smart strings that keep
+    # a reference back to their element
+    _paragraph_text_xpath = etree.XPath('.//w:t/text()', namespaces=NS, smart_strings=False)
 
-    def extract_comments_from_docx(self, file_path):
+    def extract_comments_from_docx(self, file_path, docx_zip=None):
+        """Read the comments out of a DOCX; docx_zip may be the caller's open archive of file_path"""
         comments_data = []
         
         try:
-            with zipfile.ZipFile(file_path, 'r') as docx_zip:
-                if 'word/comments.xml' not in docx_zip.namelist():
-                    print("No comments found in document")
+            with nullcontext(docx_zip) if docx_zip is not None else zipfile.ZipFile(file_path, 'r') as docx_zip:
+                # A missing or zero-length part means no comments; the central
+                # directory answers both without decompressing anything
+                comments_info = docx_zip.NameToInfo.get('word/comments.xml')
+                if comments_info is None or comments_info.file_size == 0:
+                    logger.debug("No comments found in document")
                     return comments_data
                 
-                comments_xml = docx_zip.read('word/comments.xml')
-                root = ET.fromstring(comments_xml)
-                
-                namespaces = {
-                    'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
-                }
-                
-                for comment in root.findall('.//w:comment', namespaces):
-                    comment_id = comment.get('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id')
-                    author = comment.get('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}author', 'Unknown')
-                    date = comment.get('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}date', '')
-                    
-                    comment_text = ""
-                    for p in comment.findall('.//w:p', namespaces):
-                        para_text = ""
-                        for t in p.findall('.//w:t', namespaces):
-                            if t.text:
-                                para_text += t.text
-                        if para_text.strip():
-                            comment_text += para_text + "\n"
-                    
-                    comment_text = comment_text.strip()
-                    
-                    if comment_text:
-                        paragraph_id = self.find_comment_paragraph_id(docx_zip, comment_id, namespaces)
+                # Streaming pass, fed straight from the member's decompressing
+                # stream, that only surfaces finished <w:comment> elements; each
+                # one is read and then dropped, along with the comments before
+                # it, so the tree never holds more than one comment
+                with docx_zip.open('word/comments.xml') as comments_xml:
+                    for _, elem in etree.iterparse(
+                        comments_xml, events=('end',), tag=COMMENT_TAG,
+                        remove_blank_text=True, resolve_entities=False,
+                    ):
+                        lines = []
+                        for para in elem.iter(P_TAG):
+                            para_text = ''.join(self._paragraph_text_xpath(para))
+                            if para_text.strip():
+                                lines.append(para_text)
+                        comment_text = '\n'.join(lines).strip()
                         
-                        comments_data.append({
-                            'comment_id': comment_id,
-                            'author': author,
-                            'text': comment_text,
-                            'date': date,
-                            'paragraph_id': paragraph_id
-                        })
+                        if comment_text:
+                            comments_data.append({
+                                'comment_id': elem.get(W_ID),
+                                'author': elem.get(W_AUTHOR, 'Unknown'),
+                                'text': comment_text,
+                                'date': elem.get(W_DATE, ''),
+                                'paragraph_id': 1
+                            })
+                        
+                        elem.clear()
+                        while elem.getprevious() is not None:
+                            del elem.getparent()[0]
+                
+                # Resolve every comment's paragraph from one pass over document.xml
+                if comments_data:
+                    comment_paragraphs = self._build_comment_to_paragraph_map(
+                        docx_zip, {comment_data['comment_id'] for comment_data in comments_data}
+                    )
+                    for comment_data in comments_data:
+                        comment_data['paragraph_id'] = comment_paragraphs.get(comment_data['comment_id'], 1)
         
-        except Exception as e:
-            print(f"Error extracting comments: {e}")
+        except (zipfile.BadZipFile, etree.XMLSyntaxError, OSError) as e:
+            logger.warning("Error extracting comments: %s", e)
             
         return comments_data
 
-    def find_comment_paragraph_id(self, docx_zip, comment_id, namespaces):
+    def _build_comment_to_paragraph_map(self, docx_zip, comment_ids=None):
+        """Map each comment id to the number of the non-empty paragraph it is anchored in
+
+        With comment_ids given, the scan stops as soon as every one of them has
+        been placed; comments anchored early in a long document don't pay for
+        parsing the rest of it.
+        """
+        para_tag = P_TAG
+        text_tag = T_TAG
+        marker_tags = (COMMENT_REFERENCE_TAG, COMMENT_RANGE_START_TAG)
+        
+        # Paragraphs are numbered in the same single pass, the moment one turns
+        # out to hold visible text, so no per-paragraph list is kept - only the
+        # stack of open (nested) paragraphs as [number or 0, pending comment ids].
+        # Text marks every open paragraph, outermost first, so numbers still
+        # follow document order. One isspace() check per <w:t> is enough.
+        comment_paragraphs = {}
+        open_paragraphs = []
+        paragraph_counter = 0
+        resolved = 0
+        
         try:
-            document_xml = docx_zip.read('word/document.xml')
-            root = ET.fromstring(document_xml)
-            
-            paragraph_counter = 0
-            
-            for para in root.findall('.//w:p', namespaces):
-                para_text = ""
-                for t in para.findall('.//w:t', namespaces):
-                    if t.text:
-                        para_text += t.text
-                
-                if para_text.strip():
-                    paragraph_counter += 1
+            with docx_zip.open('word/document.xml') as document_xml:
+                # libxml2 filters the events down to the four tags used here, so run
+                # properties, drawings and the like never reach Python
+                for event, elem in etree.iterparse(
+                    document_xml, events=('start', 'end'), tag=(para_tag, text_tag) + marker_tags,
+                    remove_blank_text=True, resolve_entities=False,
+                ):
+                    tag = elem.tag
+                    if event == 'start':
+                        if tag == para_tag:
+                            open_paragraphs.append([0, []])
+                        elif tag in marker_tags:
+                            comment_id = elem.get(W_ID)
+                            for entry in open_paragraphs:
+                                if entry[0]:
+                                    comment_paragraphs.setdefault(comment_id, entry[0])
+                                else:
+                                    entry[1].append(comment_id)
+                    elif tag == text_tag:
+                        text = elem.text
+                        # Once the innermost paragraph is numbered, every outer one is too
+                        if text and open_paragraphs and not open_paragraphs[-1][0] and not text.isspace():
+                            for entry in open_paragraphs:
+                                if not entry[0]:
+                                    paragraph_counter += 1
+                                    entry[0] = paragraph_counter
+                                    for comment_id in entry[1]:
+                                        comment_paragraphs.setdefault(comment_id, paragraph_counter)
+                                    entry[1] = None
+                    elif tag == para_tag:
+                        open_paragraphs.pop()
+                        if not open_paragraphs:
+                            # Drop the finished paragraph and the siblings already seen
+                            elem.clear()
+                            while elem.getprevious() is not None:
+                                del elem.getparent()[0]
                     
-                    comment_refs = para.findall(f'.//w:commentReference[@w:id="{comment_id}"]', namespaces)
-                    comment_starts = para.findall(f'.//w:commentRangeStart[@w:id="{comment_id}"]', namespaces)
-                    
-                    if comment_refs or comment_starts:
-                        return paragraph_counter
-            
-        except Exception as e:
-            print(f"Error finding comment paragraph: {e}")
+                    # An id's first placement is final, so once all the wanted ids
+                    # are in the map nothing later in the document can change it
+                    if comment_ids is not None and len(comment_paragraphs) != resolved:
+                        resolved = len(comment_paragraphs)
+                        if comment_ids.issubset(comment_paragraphs):
+                            break
         
-        return 1
+        except (KeyError, etree.XMLSyntaxError) as e:
+            logger.warning("Error finding comment paragraphs: %s", e)
+        
+        return comment_paragraphs
+
+    def _import_contents(self, document, file_path, extracted_comments, docx_zip=None):
+        """Create document's paragraphs, images and comments from the DOCX; returns (paragraphs_data, comments_data)"""
+        # Use enhanced parser
+        parser = EnhancedDocxParser(file_path, document)
+        paragraphs_data = parser.parse_document(docx_zip)
+        
+        # Paragraph objects for comment linking, as saved by the parser (no re-query)
+        paragraph_objects = parser.paragraphs
+
+        comments_to_create = []
+        
+        for comment_data in extracted_comments:
+            # Only the id conversions can fail; a malformed w:id skips that comment
+            try:
+                paragraph_id = int(comment_data['paragraph_id'])
+                comment_id = int(comment_data['comment_id'])
+            except (TypeError, ValueError) as e:
+                logger.warning("Error creating comment: %s", e)
+                continue
+            
+            paragraph = paragraph_objects.get(paragraph_id)
+            if paragraph:
+                comments_to_create.append(Comment(
+                    document=document,
+                    paragraph=paragraph,
+                    comment_id=comment_id,
+                    author=comment_data['author'],
+                    text=comment_data['text']
+                ))
+        
+        Comment.objects.bulk_create(comments_to_create, batch_size=500)
+        
+        comments_data = [{
+            'id': comment_obj.comment_id,
+            'author': comment_obj.author,
+            'text': comment_obj.text,
+            'paragraph_id': comment_obj.paragraph.paragraph_id
+        } for comment_obj in comments_to_create]
+        
+        return paragraphs_data, comments_data
+
+    def _import_in_background(self, document_id, file_path):
+        """Parse an upload on the parser pool, then mark its document ready (or failed)"""
+        try:
+            # One open archive serves both the comment pass and the parser
+            with zipfile.ZipFile(file_path, 'r') as docx_zip:
+                extracted_comments = self.extract_comments_from_docx(file_path, docx_zip)
+                with transaction.atomic():
+                    document = Document.objects.select_for_update().get(id=document_id)
+                    self._import_contents(document, file_path, extracted_comments, docx_zip)
+                    document.parse_status = 'ready'
+                    document.save(update_fields=['parse_status'])
+        except Exception:
+            logger.exception("Background parse failed for document %s", document_id)
+            Document.objects.filter(id=document_id).update(parse_status='failed')
+            # The image rows rolled back with the transaction; the files the
+            # parser already extracted did not
+            shutil.rmtree(
+                os.path.join(settings.MEDIA_ROOT, 'document_images', str(document_id)),
+                ignore_errors=True,
+            )
+        finally:
+            # Pool threads outlive the request cycle that normally closes connections
+            close_old_connections()
 
     def post(self, request):
         if 'file' not in request.FILES:
@@ -364,63 +941,71 @@ class UploadDocumentView(APIView):
         file_path = os.path.join(settings.MEDIA_ROOT, filename)
         os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
         
-        with open(file_path, 'wb+') as destination:
-            for chunk in file.chunks():
-                destination.write(chunk)
+        if hasattr(file, 'temporary_file_path'):
+            # Large uploads are already spooled to disk; move instead of copying.
+            # If the upload dir is on another filesystem, the fallback copy stays
+            # in the kernel and skips copy2's metadata copy
+            shutil.move(file.temporary_file_path(), file_path, copy_function=_copy_file)
+        else:
+            # In-memory uploads already sit in a BytesIO: write its buffer
+            # directly instead of slicing it into 1 MiB bytes copies
+            source = getattr(file, 'file', None)
+            if hasattr(source, 'getbuffer'):
+                data = source.getbuffer()
+            else:
+                file.seek(0)
+                data = memoryview(file.read())
+            with data:
+                with open(file_path, 'wb') as destination:
+                    destination.write(data)
 
         try:
-            # Create document instance with version 1
-            document = Document.objects.create(
-                filename=file.name,
-                file_path=file_path,
-                is_editable=True,  # Make all documents editable
-                version_number=1,
-                version_status='original',
-                base_document=None,  # This is the original document
-                parent_document=None,  # No parent for original upload
-                created_from_comments=False
-            )
-            
-            # Use enhanced parser
-            from .docx_parser import EnhancedDocxParser
-            parser = EnhancedDocxParser(file_path, document)
-            paragraphs_data = parser.parse_document()
-            
-            # Build paragraph objects dictionary for comment linking
-            paragraph_objects = {}
-            for para_data in paragraphs_data:
-                paragraph = Paragraph.objects.get(
-                    document=document,
-                    paragraph_id=para_data['id']
+            # Background mode: answer with the document ID now, parse on the pool
+            if request.GET.get('background', '').lower() in ['true', '1', 'yes']:
+                document = Document.objects.create(
+                    filename=file.name,
+                    file_path=file_path,
+                    is_editable=True,
+                    version_number=1,
+                    version_status='original',
+                    parse_status='parsing'
                 )
-                paragraph_objects[para_data['id']] = paragraph
-
-            comments_data = []
-            extracted_comments = self.extract_comments_from_docx(file_path)
+                # Queued once the row is committed, so the worker always finds it
+                transaction.on_commit(
+                    lambda: _upload_parser_pool.submit(self._import_in_background, document.id, file_path)
+                )
+                return Response({
+                    'status': 'success',
+                    'message': 'Document uploaded; parsing in background',
+                    'data': {
+                        'document_id': document.id,
+                        'parse_status': document.parse_status
+                    }
+                }, status=status.HTTP_202_ACCEPTED)
             
-            for comment_data in extracted_comments:
-                try:
-                    paragraph_id = int(comment_data['paragraph_id'])
-                    paragraph = paragraph_objects.get(paragraph_id)
+            # The archive is opened once for the comment pass and the parser.
+            # Comments are read from the file before any row is written
+            with zipfile.ZipFile(file_path, 'r') as docx_zip:
+                extracted_comments = self.extract_comments_from_docx(file_path, docx_zip)
+                
+                # The document, its paragraphs and images, and its comments commit
+                # together; a failed parse leaves no half-imported document behind
+                with transaction.atomic():
+                    # Create document instance with version 1
+                    document = Document.objects.create(
+                        filename=file.name,
+                        file_path=file_path,
+                        is_editable=True,  # Make all documents editable
+                        version_number=1,
+                        version_status='original',
+                        base_document=None,  # This is the original document
+                        parent_document=None,  # No parent for original upload
+                        created_from_comments=False
+                    )
                     
-                    if paragraph:
-                        comment_obj = Comment.objects.create(
-                            document=document,
-                            paragraph=paragraph,
-                            comment_id=int(comment_data['comment_id']),
-                            author=comment_data['author'],
-                            text=comment_data['text']
-                        )
-                        comments_data.append({
-                            'id': comment_obj.comment_id,
-                            'author': comment_obj.author,
-                            'text': comment_obj.text,
-                            'paragraph_id': paragraph_id
-                        })
-                        
-                except Exception as e:
-                    print(f"Error creating comment: {e}")
-                    continue
+                    paragraphs_data, comments_data = self._import_contents(
+                        document, file_path, extracted_comments, docx_zip
+                    )
         
             return Response({
                 'status': 'success',
@@ -433,7 +1018,7 @@ class UploadDocumentView(APIView):
             })
             
         except Exception as e:
-            print(f"Error parsing document: {e}")
+            logger.exception("Error parsing document")
             if os.path.exists(file_path):
                 os.remove(file_path)
             return Response({'error': f'Error parsing document: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -449,7 +1034,12 @@ class EditParagraphView(XMLFormattingMixin, APIView):
             return Response({'error': 'Missing required fields'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            print(f"DEBUG: EditParagraphView.put called with document_id={document_id}, paragraph_id={paragraph_id}")
+            paragraph_id = int(paragraph_id)
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid paragraph_id'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            logger.debug("EditParagraphView.put called with document_id=%s, paragraph_id=%s", document_id, paragraph_id)
             
             # Use get_document method if available (for full editor), otherwise use direct lookup
             if hasattr(self, 'get_document'):
@@ -459,11 +1049,26 @@ class EditParagraphView(XMLFormattingMixin, APIView):
             else:
                 document = Document.objects.get(id=document_id)
             
+            not_ready = parse_pending_response(document.parse_status)
+            if not_ready:
+                return not_ready
+            
+            paragraph = Paragraph.objects.get(document=document, paragraph_id=paragraph_id)
+            
+            # No-op edit (UIs resend the text on blur): skip versioning, ML checks and the DOCX rewrite
+            if paragraph.text == new_text and paragraph.html_content == "":
+                return Response({
+                    'paragraph_id': paragraph.paragraph_id,
+                    'text': paragraph.text,
+                    'ml_compliance_results': [],
+                    'document_id': document.id,
+                    'message': 'Paragraph unchanged.'
+                })
+            
+            comments_to_check = self._comments_to_check(paragraph)
+            
             # TRACK EDITED PARAGRAPHS: Mark this paragraph as edited if it has comments
-            paragraph_has_comments = Comment.objects.filter(
-                document=document, 
-                paragraph__paragraph_id=paragraph_id
-            ).exists()
+            paragraph_has_comments = bool(comments_to_check)
             
             version_created = False
             new_version_id = None
@@ -473,14 +1078,11 @@ class EditParagraphView(XMLFormattingMixin, APIView):
             if paragraph_has_comments and document.version_status == 'commented':
                 # Mark this paragraph as edited
                 document.mark_paragraph_edited(paragraph_id)
-                print(f"DEBUG: Marked paragraph {paragraph_id} as edited")
+                logger.debug("Marked paragraph %s as edited", paragraph_id)
                 
                 # Check if all commented paragraphs have been edited
                 if document.all_commented_paragraphs_edited():
-                    print(f"DEBUG: All commented paragraphs have been edited, creating new version...")
-                    
-                    import os
-                    import shutil
+                    logger.debug("All commented paragraphs have been edited, creating new version...")
                     
                     # Create new version automatically
                     base_doc = document.base_document or document
@@ -491,11 +1093,11 @@ class EditParagraphView(XMLFormattingMixin, APIView):
                     name_parts = os.path.splitext(original_name)
                     new_filename = f"{name_parts[0]}_v{next_version_number}{name_parts[1]}"
                     
-                    # Copy file
+                    # Share the file with the new version; edits to either copy-on-write
                     original_path = document.file_path
                     media_dir = os.path.dirname(original_path)
                     new_file_path = os.path.join(media_dir, new_filename)
-                    shutil.copy2(original_path, new_file_path)
+                    _run_docx_write(self._clone_docx, original_path, new_file_path)
                     
                     # Create new document version
                     new_version = Document.objects.create(
@@ -511,30 +1113,12 @@ class EditParagraphView(XMLFormattingMixin, APIView):
                     )
                     
                     # Copy paragraphs from current version
-                    current_paragraphs = document.paragraphs.all().order_by('paragraph_id')
-                    paragraph_mapping = {}
-                    
-                    for old_paragraph in current_paragraphs:
-                        new_paragraph = Paragraph.objects.create(
-                            document=new_version,
-                            paragraph_id=old_paragraph.paragraph_id,
-                            text=old_paragraph.text,
-                            html_content=old_paragraph.html_content,
-                            has_images=old_paragraph.has_images
-                        )
-                        paragraph_mapping[old_paragraph.paragraph_id] = new_paragraph
-                        
-                        # Copy paragraph images if any
-                        for para_image in old_paragraph.paragraph_images.all():
-                            ParagraphImage.objects.create(
-                                paragraph=new_paragraph,
-                                document_image=para_image.document_image,
-                                position_in_paragraph=para_image.position_in_paragraph
-                            )
+                    copy_paragraphs_to_version(document, new_version)
                     
                     # Update original document status to archived
                     document.version_status = 'archived'
                     document.save()
+                    _forget_docx_file(original_path)
                     
                     # Switch to editing the new version
                     document = new_version
@@ -544,35 +1128,46 @@ class EditParagraphView(XMLFormattingMixin, APIView):
                     new_version_number = next_version_number
                     version_message = f'All commented paragraphs edited - created v{next_version_number}'
                     
-                    print(f"DEBUG: Auto-created v{next_version_number} (ID: {new_version.id}) - all commented paragraphs completed")
+                    logger.debug("Auto-created v%s (ID: %s) - all commented paragraphs completed", next_version_number, new_version.id)
                 else:
                     remaining = document.get_remaining_commented_paragraphs()
-                    print(f"DEBUG: Still {len(remaining)} commented paragraphs to edit: {remaining}")
+                    logger.debug("Still %s commented paragraphs to edit: %s", len(remaining), remaining)
                     version_message = f'Progress: {len(document.edited_commented_paragraphs)}/{len(document.get_commented_paragraph_ids())} commented paragraphs edited'
             
-            paragraph = Paragraph.objects.get(document=document, paragraph_id=paragraph_id)
-            print(f"DEBUG: Found paragraph {paragraph_id}, processing ML compliance checks...")
+            if version_created:
+                # The edit now applies to the paragraph in the new version
+                paragraph = Paragraph.objects.get(document=document, paragraph_id=paragraph_id)
+                comments_to_check = self._comments_to_check(paragraph)
+            logger.debug("Found paragraph %s, processing ML compliance checks...", paragraph_id)
             
             # SMART COMMENT MANAGEMENT: Check ML compliance before deciding to delete comments
             # New workflow: Comment → Edit → ML Check → Delete only if compliant
-            comments_to_check = Comment.objects.filter(paragraph=paragraph)
             ml_results = []
             compliant_comment_ids = []
             deleted_comment_ids = []
             
-            if comments_to_check.exists():
-                print(f"ML compliance checking {comments_to_check.count()} comments for paragraph {paragraph_id}")
+            if comments_to_check:
+                logger.debug("ML compliance checking %s comments for paragraph %s", len(comments_to_check), paragraph_id)
                 
                 # Get original text for ML comparison
                 original_text = paragraph.text or ""
                 
-                # Check each comment for ML compliance
-                for comment in comments_to_check:
+                # Resolve the model once for the whole batch of comments
+                try:
+                    compliance_model = self.get_compliance_model()
+                except Exception as e:
+                    logger.warning("Could not load compliance model: %s", e)
+                    compliance_model = None
+                
+                # Score every comment in one model call (ML or fallback to basic compliance checking)
+                batch_results = self.check_comments_compliance(
+                    original_text, [comment.text for comment in comments_to_check], new_text, compliance_model
+                )
+                
+                # Apply each comment's ML compliance result
+                for comment, ml_result in zip(comments_to_check, batch_results):
                     try:
-                        print(f"DEBUG: Checking compliance for comment {comment.comment_id}")
-                        # Use ML or fallback to basic compliance checking
-                        ml_result = self.check_comment_compliance(original_text, comment.text, new_text)
-                        print(f"DEBUG: ML result for comment {comment.comment_id}: {ml_result}")
+                        logger.debug("ML result for comment %s: %s", comment.comment_id, ml_result)
                         
                         # Determine proper status based on score (override ML prediction if needed)
                         final_status = ml_result['prediction']
@@ -590,7 +1185,6 @@ class EditParagraphView(XMLFormattingMixin, APIView):
                         comment.compliance_status = final_status
                         comment.compliance_score = score
                         comment.last_checked = timezone.now()
-                        comment.save()
                         
                         ml_results.append({
                             'comment_id': comment.comment_id,
@@ -605,68 +1199,53 @@ class EditParagraphView(XMLFormattingMixin, APIView):
                             # Check if comment is already scheduled for deletion
                             if comment.scheduled_deletion_at is None:
                                 # Schedule deletion in 5 minutes
-                                from datetime import timedelta
                                 scheduled_time = timezone.now() + timedelta(minutes=5)
                                 comment.scheduled_deletion_at = scheduled_time
-                                comment.save()
                                 
-                                print(f"SCHEDULED compliant comment {comment.comment_id} for deletion at {scheduled_time.strftime('%H:%M:%S')} (score: {ml_result['compliance_score']:.2f})")
+                                logger.info("SCHEDULED compliant comment %s for deletion at %s (score: %.2f)", comment.comment_id, scheduled_time, ml_result['compliance_score'])
                                 compliant_comment_ids.append(comment.comment_id)
                             else:
-                                print(f"ALREADY SCHEDULED comment {comment.comment_id} for deletion at {comment.scheduled_deletion_at.strftime('%H:%M:%S')}")
+                                logger.debug("ALREADY SCHEDULED comment %s for deletion at %s", comment.comment_id, comment.scheduled_deletion_at)
                         else:
                             # Clear any existing scheduled deletion if compliance changed
                             if comment.scheduled_deletion_at is not None:
                                 comment.scheduled_deletion_at = None
-                                comment.save()
-                                print(f"CANCELLED scheduled deletion for comment {comment.comment_id} - no longer compliant")
-                            print(f"KEEPING comment {comment.comment_id} - {ml_result['prediction']} (score: {ml_result['compliance_score']:.2f})")
+                                logger.info("CANCELLED scheduled deletion for comment %s - no longer compliant", comment.comment_id)
+                            logger.debug("KEEPING comment %s - %s (score: %.2f)", comment.comment_id, ml_result['prediction'], ml_result['compliance_score'])
                     
                     except Exception as e:
-                        print(f"Error: ML compliance check failed for comment {comment.comment_id}: {e}")
-                        print(f"Exception type: {type(e).__name__}")
-                        print(f"Exception traceback: {e}")
+                        logger.exception("ML compliance check failed for comment %s", comment.comment_id)
                         # Keep comment with pending status on ML failure
                         comment.compliance_status = 'pending'
-                        comment.save()
+                
+                # Persist every comment's new compliance state in one UPDATE
+                Comment.objects.bulk_update(
+                    comments_to_check,
+                    ['compliance_status', 'compliance_score', 'last_checked', 'scheduled_deletion_at']
+                )
             
-            print(f"DEBUG: Updating paragraph {paragraph_id} text in database...")
+            logger.debug("Updating paragraph %s text in database...", paragraph_id)
             # Update paragraph text in database
             paragraph.text = new_text
             # Clear html_content so the plain text will be displayed
             paragraph.html_content = ""
             paragraph.save()
             
-            print(f"DEBUG: Updating paragraph {paragraph_id} text in DOCX file...")
-            # Update paragraph text in DOCX file with file integrity check
-            try:
-                # Check if file exists and is a valid zip before attempting to modify it
-                if not os.path.exists(document.file_path):
-                    print(f"Warning: DOCX file not found at {document.file_path}, skipping DOCX update")
-                else:
-                    # Test if file is a valid zip/DOCX file
-                    try:
-                        with zipfile.ZipFile(document.file_path, 'r') as test_zip:
-                            test_zip.testzip()  # This will raise an exception if the file is corrupted
-                        print(f"DEBUG: DOCX file integrity check passed")
-                        self.update_paragraph_in_docx(document.file_path, paragraph_id, new_text)
-                        print(f"DEBUG: Successfully updated DOCX file")
-                    except (zipfile.BadZipFile, zipfile.LargeZipFile) as zip_error:
-                        print(f"Error: DOCX file is corrupted or not a valid zip file: {zip_error}")
-                        print(f"Continuing with database update only...")
-                        # Don't fail the entire request if DOCX update fails
-            except Exception as file_error:
-                print(f"Warning: Could not update DOCX file: {file_error}")
-                print(f"Continuing with database update only...")
-            
-            print(f"DEBUG: Successfully completed EditParagraphView.put for paragraph {paragraph_id}")
+            logger.debug("Updating paragraph %s text in DOCX file...", paragraph_id)
+            docx_success, docx_error = self._write_docx_after_commit(
+                self._update_docx_file, document.file_path, paragraph_id, new_text
+            )
+            
+            logger.debug("Successfully completed EditParagraphView.put for paragraph %s", paragraph_id)
             
             # Update response with ML compliance results and versioning info
             response_data = {
                 'paragraph_id': paragraph.paragraph_id,
                 'text': paragraph.text,
                 'ml_compliance_results': ml_results,
-                'document_id': document.id  # Include current document ID (may have changed due to auto-versioning)
+                'document_id': document.id,  # Include current document ID (may have changed due to auto-versioning)
+                'docx_success': docx_success,
+                'docx_error': docx_error
             }
             
             # Add version information if auto-versioning occurred
@@ -680,163 +1259,131 @@ class EditParagraphView(XMLFormattingMixin, APIView):
             
             if compliant_comment_ids:
                 response_data['scheduled_deletions'] = compliant_comment_ids
-                if version_message:
-                    response_data['message'] = f'{version_message}. {len(compliant_comment_ids)} compliant comment(s) scheduled for deletion in 5 minutes.'
-                else:
-                    response_data['message'] = f'Paragraph updated. {len(compliant_comment_ids)} compliant comment(s) scheduled for deletion in 5 minutes. {len(ml_results) - len(compliant_comment_ids)} comment(s) remain.'
-            elif ml_results:
-                if version_message:
-                    response_data['message'] = f'{version_message}. {len(ml_results)} comment(s) checked - none were compliant enough for scheduled deletion.'
-                else:
-                    response_data['message'] = f'Paragraph updated. {len(ml_results)} comment(s) checked - none were compliant enough for scheduled deletion.'
-            else:
-                response_data['message'] = version_message or 'Paragraph updated.'
+            response_data['message'] = self._build_message(version_message, compliant_comment_ids, ml_results)
             
             return Response(response_data)
             
         except Document.DoesNotExist:
-            print(f"ERROR: Document {document_id} not found")
+            logger.warning("Document %s not found", document_id)
             return Response({'error': 'Document not found'}, status=status.HTTP_404_NOT_FOUND)
         except Paragraph.DoesNotExist:
-            print(f"ERROR: Paragraph {paragraph_id} not found in document {document_id}")
+            logger.warning("Paragraph %s not found in document %s", paragraph_id, document_id)
             return Response({'error': 'Paragraph not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
-            print(f"CRITICAL ERROR in EditParagraphView.put: {e}")
-            print(f"Exception type: {type(e).__name__}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error in EditParagraphView.put")
             return Response({'error': f'Error updating paragraph: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
-    def check_comment_compliance(self, original_text: str, comment_text: str, edited_text: str):
-        """Check compliance using ML system (with fallback to basic system)"""
+    def _comments_to_check(self, paragraph):
+        """Load a paragraph's comments with only the columns the compliance loop touches"""
+        return list(Comment.objects.filter(paragraph=paragraph).only(
+            'id', 'paragraph', 'comment_id', 'text', 'compliance_status',
+            'compliance_score', 'last_checked', 'scheduled_deletion_at'
+        ))
+
+    # Reply message per (has version message, has scheduled deletions, has ML results)
+    _MESSAGE_TEMPLATES = {
+        (True, True, True): '{version_message}. {scheduled} compliant comment(s) scheduled for deletion in 5 minutes.',
+        (False, True, True): 'Paragraph updated. {scheduled} compliant comment(s) scheduled for deletion in 5 minutes. {remaining} comment(s) remain.',
+        (True, False, True): '{version_message}. {checked} comment(s) checked - none were compliant enough for scheduled deletion.',
+        (False, False, True): 'Paragraph updated. {checked} comment(s) checked - none were compliant enough for scheduled deletion.',
+        (True, False, False): '{version_message}',
+        (False, False, False): 'Paragraph updated.',
+    }
+
+    def _build_message(self, version_message, compliant_ids, ml_results):
+        """Build the reply message for a paragraph edit from the template table"""
+        template = self._MESSAGE_TEMPLATES[(bool(version_message), bool(compliant_ids), bool(ml_results))]
+        return template.format(
+            version_message=version_message,
+            scheduled=len(compliant_ids),
+            remaining=len(ml_results) - len(compliant_ids),
+            checked=len(ml_results),
+        )
+
+    def get_compliance_model(self):
+        """Resolve the compliance model to use, as a (model, model_type) pair"""
+        return get_compliance_model()
+
+    def check_comments_compliance(self, original_text: str, comment_texts: list, edited_text: str, compliance_model=None):
+        """Check compliance of several comments against one edit using ML system (with fallback to basic system)
+
+        All comments go through the model's predict_batch in a single call.
+        compliance_model is an optional (model, model_type) pair from
+        get_compliance_model(). Returns one result dict per comment text.
+        """
         try:
-            # Try advanced ML system first
-            if ML_FULL_SYSTEM_AVAILABLE and ML_DEPENDENCIES_AVAILABLE:
-                ml_model = get_or_create_default_model()
-                if ml_model is not None:
-                    result = ml_model.predict(original_text, comment_text, edited_text)
-                    return {
-                        'prediction': result['prediction'],
-                        'compliance_score': result['compliance_score'],
-                        'confidence': result['confidence'],
-                        'model_type': 'advanced_ml'
-                    }
-            
-            # Fallback to basic system
-            basic_model = get_basic_compliance_model()
-            result = basic_model.predict(original_text, comment_text, edited_text)
-            return {
+            model, model_type = compliance_model or self.get_compliance_model()
+            count = len(comment_texts)
+            results = model.predict_batch([original_text] * count, comment_texts, [edited_text] * count)
+            return [{
                 'prediction': result['prediction'],
                 'compliance_score': result['compliance_score'],
                 'confidence': result['confidence'],
-                'model_type': 'basic'
-            }
+                'model_type': model_type
+            } for result in results]
             
         except Exception as e:
-            print(f"Warning: ML compliance check failed: {e}")
+            logger.warning("ML compliance check failed: %s", e)
             # Return safe default on error
-            return {
-                'prediction': 'pending',
-                'compliance_score': 0.0,
-                'confidence': 0.0,
-                'model_type': 'error_fallback'
-            }
-            
-        except Document.DoesNotExist:
-            return Response({'error': 'Document not found'}, status=status.HTTP_404_NOT_FOUND)
-        except Paragraph.DoesNotExist:
-            return Response({'error': 'Paragraph not found'}, status=status.HTTP_404_NOT_FOUND)
-        except Exception as e:
-            print(f"Error editing paragraph: {e}")
-            return Response({'error': f'Error editing paragraph: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return [_ERROR_FALLBACK_RESULT] * len(comment_texts)
 
-    def update_paragraph_in_docx(self, file_path, paragraph_id, new_text):
+    # Compiled once at class scope; libxml2 evaluates them instead of Python-level findall
+    _runs_xpath = etree.XPath('.//w:r', namespaces=NS)
+    _text_elements_xpath = etree.XPath('.//w:t', namespaces=NS)
+
+    def _update_docx_file(self, file_path, paragraph_id, new_text):
+        """Apply a paragraph edit to the DOCX file after an integrity check"""
+        # Check if file exists and is a valid zip before attempting to modify it
+        if not os.path.exists(file_path):
+            logger.warning("DOCX file not found at %s, skipping DOCX update", file_path)
+            return
+        
+        # Test if file is a valid zip/DOCX file (cached until the file changes)
         try:
-            # Debug: Check if method exists
-            if not hasattr(self, '_recreate_docx_with_proper_xml_formatting'):
-                print(f"ERROR: {self.__class__.__name__} does not have _recreate_docx_with_proper_xml_formatting method")
-                print(f"MRO: {[cls.__name__ for cls in self.__class__.__mro__]}")
-                # Fallback without XML formatting
-                raise AttributeError("XML formatting method not available")
-            
-            # Create a backup
-            backup_path = file_path + '.backup'
-            shutil.copy2(file_path, backup_path)
-            
-            # Extract the DOCX
-            temp_dir = file_path + '_temp'
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-            
-            # Update document.xml
-            document_path = os.path.join(temp_dir, 'word', 'document.xml')
-            
-            if not os.path.exists(document_path):
-                raise Exception("Document.xml not found")
-            
-            ET.register_namespace('w', 'http://schemas.openxmlformats.org/wordprocessingml/2006/main')
-            
-            tree = ET.parse(document_path)
-            root = tree.getroot()
-            
-            namespaces = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
-            
-            # Find and update the target paragraph
-            paragraphs = root.findall('.//w:p', namespaces)
-            paragraph_counter = 0
-            
-            for para in paragraphs:
-                # Check if paragraph has text content
-                para_text = ""
-                for t in para.findall('.//w:t', namespaces):
-                    if t.text:
-                        para_text += t.text
+            self._get_zip_infos(file_path)
+            logger.debug("DOCX file integrity check passed")
+            self.update_paragraph_in_docx(file_path, paragraph_id, new_text)
+            logger.debug("Successfully updated DOCX file")
+        except (zipfile.BadZipFile, zipfile.LargeZipFile) as zip_error:
+            logger.error("DOCX file is corrupted or not a valid zip file: %s; continuing with database update only", zip_error)
+
+    def update_paragraph_in_docx(self, file_path, paragraph_id, new_text):
+        # Only document.xml changes; it is edited in memory with lxml and every
+        # other member is copied through untouched when the archive is rewritten
+        def edit(root):
+            # Find and update the target paragraph (paragraph_id counts paragraphs with text)
+            paragraphs = self._paragraphs_xpath(root)
+            positions = self._text_paragraph_positions(file_path, 'all', paragraphs)
+            
+            if 0 < paragraph_id <= len(positions):
+                para = paragraphs[positions[paragraph_id - 1]]
                 
-                if para_text.strip():
-                    paragraph_counter += 1
-                    
-                    if paragraph_counter == paragraph_id:
-                        # Clear existing text elements but preserve structure
-                        runs = para.findall('.//w:r', namespaces)
-                        
-                        # Remove all text elements from runs
-                        for run in runs:
-                            text_elements = run.findall('.//w:t', namespaces)
-                            for text_elem in text_elements:
-                                run.remove(text_elem)
-                        
-                        # If no runs exist, create one
-                        if not runs:
-                            new_run = ET.SubElement(para, '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}r')
-                            runs = [new_run]
-                        
-                        # Add new text to the first run
-                        if new_text.strip():
-                            first_run = runs[0]
-                            new_text_elem = ET.SubElement(first_run, '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t')
-                            new_text_elem.text = new_text
-                            
-                            if new_text != new_text.strip():
-                                new_text_elem.set('{http://www.w3.org/XML/1998/namespace}space', 'preserve')
-                        
-                        break
-            
-            tree.write(document_path, encoding='utf-8', xml_declaration=True)
-            
-            # Recreate the DOCX file with proper XML formatting for ALL files
-            self._recreate_docx_with_proper_xml_formatting(file_path, temp_dir)
-            
-            shutil.rmtree(temp_dir)
-            os.remove(backup_path)
-            
-        except Exception as e:
-            # Restore backup if something went wrong
-            if os.path.exists(backup_path):
-                shutil.copy2(backup_path, file_path)
-                os.remove(backup_path)
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-            raise e
+                # The text nodes are rewritten in place, so runs and their formatting
+                # stay as they are: the first <w:t> takes the new text, the rest are emptied
+                text_elems = self._text_elements_xpath(para)
+                if text_elems:
+                    new_text_elem = text_elems[0]
+                    new_text_elem.text = new_text
+                    for text_elem in text_elems[1:]:
+                        text_elem.text = ''
+                elif new_text.strip():
+                    # No text yet: add it to the first run, creating one if needed
+                    runs = self._runs_xpath(para)
+                    first_run = runs[0] if runs else etree.SubElement(para, R_TAG)
+                    new_text_elem = etree.SubElement(first_run, T_TAG)
+                    new_text_elem.text = new_text
+                else:
+                    new_text_elem = None
+                
+                if new_text_elem is not None and _needs_space_preserve(new_text):
+                    new_text_elem.set(SPACE_ATTR, 'preserve')
+            return positions
+        
+        positions = self._mutate_document(file_path, edit)
+        
+        if new_text.strip():
+            # The paragraph still has text, so every position is unchanged
+            self._store_paragraph_positions(file_path, 'all', positions)
 
 
 class AddParagraphView(XMLFormattingMixin, APIView):
@@ -848,144 +1395,118 @@ class AddParagraphView(XMLFormattingMixin, APIView):
         if not document_id:
             return Response({'error': 'Document ID is required'}, status=status.HTTP_400_BAD_REQUEST)
         
+        if position not in (None, ''):
+            try:
+                position = int(position)
+            except (TypeError, ValueError):
+                return Response({'error': 'Invalid position'}, status=status.HTTP_400_BAD_REQUEST)
+        
         # Allow empty text for new paragraphs
         if text is None:
             text = ''
         
         try:
-            document = Document.objects.get(id=document_id)
-            
-            # Determine the new paragraph ID
-            if position and position > 0:
-                new_paragraph_id = position
-                # Update existing paragraphs with IDs >= position
-                paragraphs_to_update = Paragraph.objects.filter(
-                    document=document, 
-                    paragraph_id__gte=position
-                ).order_by('-paragraph_id')  # Order by descending to avoid conflicts
+            with transaction.atomic():
+                # The document row lock serializes concurrent adds and deletes, so
+                # two renumbers never interleave or pick the same new ID
+                document = Document.objects.select_for_update().get(id=document_id)
+                not_ready = parse_pending_response(document.parse_status)
+                if not_ready:
+                    return not_ready
                 
-                for para in paragraphs_to_update:
-                    para.paragraph_id += 1
-                    para.save()
-            else:
-                # Add at the end
-                last_paragraph = Paragraph.objects.filter(document=document).order_by('-paragraph_id').first()
-                new_paragraph_id = (last_paragraph.paragraph_id + 1) if last_paragraph else 1
-            
-            # Create paragraph in database
-            paragraph = Paragraph.objects.create(
-                document=document,
-                paragraph_id=new_paragraph_id,
-                text=text
-            )
+                # Determine the new paragraph ID
+                if position and position > 0:
+                    new_paragraph_id = position
+                    # Shift existing paragraphs with IDs >= position in two UPDATEs;
+                    # the offset keeps (document, paragraph_id) unique mid-statement
+                    paragraphs_to_update = Paragraph.objects.filter(
+                        document=document, 
+                        paragraph_id__gte=position
+                    )
+                    paragraphs_to_update.update(paragraph_id=F('paragraph_id') + RENUMBER_OFFSET)
+                    Paragraph.objects.filter(
+                        document=document,
+                        paragraph_id__gte=position + RENUMBER_OFFSET
+                    ).update(paragraph_id=F('paragraph_id') - RENUMBER_OFFSET + 1)
+                else:
+                    # Add at the end
+                    last_paragraph = Paragraph.objects.filter(document=document).order_by('-paragraph_id').first()
+                    new_paragraph_id = (last_paragraph.paragraph_id + 1) if last_paragraph else 1
+                
+                # Create paragraph in database
+                paragraph = Paragraph.objects.create(
+                    document=document,
+                    paragraph_id=new_paragraph_id,
+                    text=text
+                )
             
             # Add paragraph to DOCX file
-            self.add_paragraph_to_docx(document.file_path, new_paragraph_id, text, position)
+            docx_success, docx_error = self._write_docx_after_commit(
+                self.add_paragraph_to_docx, document.file_path, new_paragraph_id, text, position
+            )
             
             return Response({
                 'paragraph_id': paragraph.paragraph_id,
                 'text': paragraph.text,
-                'message': 'Paragraph added successfully'
+                'message': 'Paragraph added successfully',
+                'docx_success': docx_success,
+                'docx_error': docx_error
             }, status=status.HTTP_201_CREATED)
             
         except Document.DoesNotExist:
             return Response({'error': 'Document not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
-            print(f"Error adding paragraph: {e}")
-            import traceback
-            traceback.print_exc()  # for debigging
+            logger.exception("Error adding paragraph")
             return Response({'error': f'Error adding paragraph: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def add_paragraph_to_docx(self, file_path, paragraph_id, text, position=None):
-        backup_path = None
-        temp_dir = None
-        
-        try:
-            # Create a backup
-            backup_path = file_path + '.backup'
-            shutil.copy2(file_path, backup_path)
-            
-            # Extract the DOCX
-            temp_dir = file_path + '_temp'
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-                
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-            
-            # Update document.xml
-            document_path = os.path.join(temp_dir, 'word', 'document.xml')
-            
-            if not os.path.exists(document_path):
-                raise Exception(f"Document.xml not found at {document_path}")
-            
-            # Register namespace to preserve XML structure
-            ET.register_namespace('', 'http://schemas.openxmlformats.org/wordprocessingml/2006/main')
-            ET.register_namespace('w', 'http://schemas.openxmlformats.org/wordprocessingml/2006/main')
-            
-            tree = ET.parse(document_path)
-            root = tree.getroot()
-            
-            namespaces = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
-            
+        # The original prefixes survive the round trip through lxml
+        def insert(root):
             # Create new paragraph element with proper namespace
-            w_ns = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
-            new_para = ET.Element(f'{w_ns}p')
-            new_run = ET.SubElement(new_para, f'{w_ns}r')
-            new_text_elem = ET.SubElement(new_run, f'{w_ns}t')
+            new_para = root.makeelement(P_TAG)
+            new_run = etree.SubElement(new_para, R_TAG)
+            new_text_elem = etree.SubElement(new_run, T_TAG)
             new_text_elem.text = text if text.strip() else ' '  # Ensure at least a space
+            if _needs_space_preserve(new_text_elem.text):
+                new_text_elem.set(SPACE_ATTR, 'preserve')
             
             # Find the body element
-            body = root.find('.//w:body', namespaces)
+            body = next(root.iter(BODY_TAG), None)
             if body is None:
                 raise Exception("Document body not found")
             
-            if position and position > 0:
-                # Insert at specific position
-                all_paragraphs = body.findall('w:p', namespaces)
-                
-                # Count only non-empty paragraphs to match our numbering system
-                non_empty_count = 0
-                insert_index = len(all_paragraphs)  # Default to end
-                
-                for i, para in enumerate(all_paragraphs):
-                    # Check if paragraph has text content
-                    para_text = ""
-                    for t in para.findall('.//w:t', namespaces):
-                        if t.text:
-                            para_text += t.text
-                    
-                    if para_text.strip():
-                        non_empty_count += 1
-                        
-                    if non_empty_count == position - 1:
-                        insert_index = i + 1
-                        break
-                
-                body.insert(insert_index, new_para)
-            else:
+            if not (position and position > 0):
                 # Add at the end
                 body.append(new_para)
-            
-            tree.write(document_path, encoding='utf-8', xml_declaration=True)
-            
-            # Recreate the DOCX file with proper XML formatting
-            self._recreate_docx_with_proper_xml_formatting(file_path, temp_dir)
-            
-            # Cleanup
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-            if backup_path and os.path.exists(backup_path):
-                os.remove(backup_path)
-            
-        except Exception as e:
-            # Restore backup if something went wrong
-            if backup_path and os.path.exists(backup_path):
-                shutil.copy2(backup_path, file_path)
-                os.remove(backup_path)
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-            raise e
+                return None, None
+            
+            # Insert right after the (position - 1)th paragraph with text, to match
+            # our numbering system. It is found through the cached positions
+            # rather than by joining the text of every paragraph before it
+            paragraphs = body.findall(P_TAG)
+            positions = self._text_paragraph_positions(file_path, 'body', paragraphs)
+            
+            if position == 1:
+                insert_index = 0
+                body.insert(0, new_para)
+            elif position - 1 <= len(positions):
+                insert_index = positions[position - 2] + 1
+                paragraphs[insert_index - 1].addnext(new_para)
+            else:
+                # Past the last paragraph: add at the end
+                insert_index = len(paragraphs)
+                body.append(new_para)
+            return positions, insert_index
+        
+        # Only document.xml is replaced; every other member is copied through
+        positions, insert_index = self._mutate_document(file_path, insert)
+        
+        if positions is not None:
+            # Paragraphs from the insertion point on move down one slot
+            new_positions = [i if i < insert_index else i + 1 for i in positions]
+            if text.strip():
+                new_positions.insert(bisect.bisect_left(positions, insert_index), insert_index)
+            self._store_paragraph_positions(file_path, 'body', new_positions)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -1003,56 +1524,59 @@ class DeleteParagraphView(XMLFormattingMixin, APIView):
             return Response({'error': 'Missing required fields'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            document = Document.objects.get(id=document_id)
-            paragraph = Paragraph.objects.get(document=document, paragraph_id=paragraph_id)
-            
-            # Check if this is the last paragraph
-            total_paragraphs = Paragraph.objects.filter(document=document).count()
-            if total_paragraphs <= 1:
-                return Response({'error': 'Cannot delete the last paragraph'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Delete associated comments first
-            deleted_comments = Comment.objects.filter(paragraph=paragraph)
-            comment_count = deleted_comments.count()
-            deleted_comments.delete()
-            
-            # Delete paragraph from DOCX file first (so we can restore if DB update fails)
-            self.delete_paragraph_from_docx(document.file_path, paragraph_id)
-            
-            # Delete paragraph from database
-            paragraph.delete()
-            
-            # Update paragraph IDs for paragraphs that come after the deleted one
-            paragraphs_to_update = Paragraph.objects.filter(
-                document=document, 
-                paragraph_id__gt=paragraph_id
-            ).order_by('paragraph_id')
-            
-            for para in paragraphs_to_update:
-                para.paragraph_id -= 1
-                para.save()
+            paragraph_id = int(paragraph_id)
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid paragraph_id'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            # The lookup, the last-paragraph check, the deletes and the renumber
+            # all run under the document row lock, like AddParagraphView, so
+            # concurrent adds and deletes can't interleave their renumbering
+            with transaction.atomic():
+                document = Document.objects.select_for_update().get(id=document_id)
+                not_ready = parse_pending_response(document.parse_status)
+                if not_ready:
+                    return not_ready
+                paragraph = Paragraph.objects.get(document=document, paragraph_id=paragraph_id)
+                
+                # Check if this is the last paragraph
+                total_paragraphs = Paragraph.objects.filter(document=document).count()
+                if total_paragraphs <= 1:
+                    return Response({'error': 'Cannot delete the last paragraph'}, status=status.HTTP_400_BAD_REQUEST)
+                
+                # Delete associated comments first; delete() reports per-model counts,
+                # so no separate COUNT query is needed
+                _, deleted_by_model = Comment.objects.filter(paragraph=paragraph).delete()
+                comment_count = deleted_by_model.get(Comment._meta.label, 0)
+                
+                # Delete paragraph from database
+                paragraph.delete()
+                
+                # Shift paragraphs after the deleted one down in two UPDATEs; the
+                # offset keeps (document, paragraph_id) unique mid-statement.
+                # Comments point at paragraph rows, which keep their primary
+                # keys, so their references follow the shift without rewrites.
+                updated_paragraphs = Paragraph.objects.filter(
+                    document=document, 
+                    paragraph_id__gt=paragraph_id
+                ).update(paragraph_id=F('paragraph_id') + RENUMBER_OFFSET)
+                Paragraph.objects.filter(
+                    document=document,
+                    paragraph_id__gt=paragraph_id + RENUMBER_OFFSET
+                ).update(paragraph_id=F('paragraph_id') - RENUMBER_OFFSET - 1)
             
-            # Also update comment references
-            comments_to_update = Comment.objects.filter(
-                document=document,
-                paragraph__paragraph_id__gt=paragraph_id - 1  # After the shift
+            # Delete paragraph from DOCX file once the database, which is
+            # authoritative, has committed
+            docx_success, docx_error = self._write_docx_after_commit(
+                self.delete_paragraph_from_docx, document.file_path, paragraph_id
             )
             
-            for comment in comments_to_update:
-                # Find the paragraph with the updated ID
-                try:
-                    comment.paragraph = Paragraph.objects.get(
-                        document=document,
-                        paragraph_id=comment.paragraph.paragraph_id
-                    )
-                    comment.save()
-                except Paragraph.DoesNotExist:
-                    comment.delete()  # Remove orphaned comments
-            
             return Response({
                 'message': 'Paragraph deleted successfully',
                 'deleted_comments': comment_count,
-                'updated_paragraphs': paragraphs_to_update.count()
+                'updated_paragraphs': updated_paragraphs,
+                'docx_success': docx_success,
+                'docx_error': docx_error
             })
             
         except Document.DoesNotExist:
@@ -1060,93 +1584,38 @@ class DeleteParagraphView(XMLFormattingMixin, APIView):
         except Paragraph.DoesNotExist:
             return Response({'error': 'Paragraph not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
-            print(f"Error deleting paragraph: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error deleting paragraph")
             return Response({'error': f'Error deleting paragraph: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def delete_paragraph_from_docx(self, file_path, paragraph_id):
-        backup_path = None
-        temp_dir = None
-        
-        try:
-            # Create a backup
-            backup_path = file_path + '.backup'
-            shutil.copy2(file_path, backup_path)
-            
-            # Extract the DOCX
-            temp_dir = file_path + '_temp'
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-                
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-            
-            # Update document.xml
-            document_path = os.path.join(temp_dir, 'word', 'document.xml')
-            
-            if not os.path.exists(document_path):
-                raise Exception(f"Document.xml not found at {document_path}")
-            
-            # Register namespaces
-            ET.register_namespace('', 'http://schemas.openxmlformats.org/wordprocessingml/2006/main')
-            ET.register_namespace('w', 'http://schemas.openxmlformats.org/wordprocessingml/2006/main')
-            
-            tree = ET.parse(document_path)
-            root = tree.getroot()
-            
-            namespaces = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
-            
+        def remove(root):
             # Find the body element first
-            body = root.find('.//w:body', namespaces)
+            body = next(root.iter(BODY_TAG), None)
             if body is None:
                 raise Exception("Document body not found")
             
-            # Find and delete the target paragraph
-            paragraphs = body.findall('w:p', namespaces)  # Direct children of body
-            paragraph_counter = 0
-            paragraph_deleted = False
-            
-            for i, para in enumerate(paragraphs):
-                # Check if paragraph has text content
-                para_text = ""
-                for t in para.findall('.//w:t', namespaces):
-                    if t.text:
-                        para_text += t.text
-                
-                if para_text.strip():
-                    paragraph_counter += 1
-                    
-                    if paragraph_counter == paragraph_id:
-                        # Remove this paragraph from the body
-                        body.remove(para)
-                        paragraph_deleted = True
-                        print(f"Deleted paragraph {paragraph_id} at position {i}")
-                        break
+            # Find and delete the target paragraph (paragraph_id counts paragraphs with text)
+            paragraphs = body.findall(P_TAG)  # Direct children of body
+            positions = self._text_paragraph_positions(file_path, 'body', paragraphs)
             
-            if not paragraph_deleted:
+            if not 0 < paragraph_id <= len(positions):
                 raise Exception(f"Paragraph {paragraph_id} not found in document")
             
-            # Write the updated XML
-            tree.write(document_path, encoding='utf-8', xml_declaration=True)
-            
-            # Recreate the DOCX file with proper XML formatting
-            self._recreate_docx_with_proper_xml_formatting(file_path, temp_dir)
-            
-            # Cleanup
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-            if backup_path and os.path.exists(backup_path):
-                os.remove(backup_path)
-            
-        except Exception as e:
-            # Restore backup if something went wrong
-            if backup_path and os.path.exists(backup_path):
-                shutil.copy2(backup_path, file_path)
-                os.remove(backup_path)
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-            raise e
+            # Remove this paragraph from the body
+            i = positions[paragraph_id - 1]
+            body.remove(paragraphs[i])
+            logger.debug("Deleted paragraph %s at position %s", paragraph_id, i)
+            return positions
+        
+        # Only document.xml is replaced; every other member is copied through
+        positions = self._mutate_document(file_path, remove)
+        
+        # Later paragraphs move up one slot
+        self._store_paragraph_positions(
+            file_path, 'body', positions[:paragraph_id - 1] + [j - 1 for j in positions[paragraph_id:]]
+        )
+
+
         
 class AddCommentView(XMLFormattingMixin, APIView):
     def post(self, request):
@@ -1159,21 +1628,35 @@ class AddCommentView(XMLFormattingMixin, APIView):
             return Response({'error': 'Missing required fields'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            document = Document.objects.get(id=document_id)
-            paragraph = Paragraph.objects.get(document=document, paragraph_id=paragraph_id)
-            
-            # Get next comment ID
-            existing_comments = Comment.objects.filter(document=document)
-            next_comment_id = max([c.comment_id for c in existing_comments] + [0]) + 1
-            
-            # Create comment in database
-            comment = Comment.objects.create(
-                document=document,
-                paragraph=paragraph,
-                comment_id=next_comment_id,
-                author=author,
-                text=text
-            )
+            paragraph_id = int(paragraph_id)
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid paragraph_id'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            # Allocating the ID and inserting the comment hold the document row
+            # lock, so concurrent adds can't both read the same MAX and collide.
+            # The paragraph and its document come back from one joined query
+            with transaction.atomic():
+                paragraph = Paragraph.objects.select_related('document').select_for_update().get(
+                    document_id=document_id, paragraph_id=paragraph_id
+                )
+                document = paragraph.document
+                not_ready = parse_pending_response(document.parse_status)
+                if not_ready:
+                    return not_ready
+                
+                # Get next comment ID (MAX computed by the database, no rows fetched)
+                max_comment_id = Comment.objects.filter(document=document).aggregate(max_id=Max('comment_id'))['max_id']
+                next_comment_id = (max_comment_id or 0) + 1
+                
+                # Create comment in database
+                comment = Comment.objects.create(
+                    document=document,
+                    paragraph=paragraph,
+                    comment_id=next_comment_id,
+                    author=author,
+                    text=text
+                )
             
             # Update document status to 'commented' if it was 'original'
             document.update_status_based_on_comments()
@@ -1182,11 +1665,18 @@ class AddCommentView(XMLFormattingMixin, APIView):
             docx_success = True
             docx_error = None
             try:
-                self.add_comment_to_docx(document.file_path, paragraph_id, next_comment_id, author, text)
+                _run_docx_write(
+                    self.add_comment_to_docx,
+                    document.file_path, paragraph_id, next_comment_id, author, text,
+                    comments_wired=document.has_comments_rel,
+                )
+                if not document.has_comments_rel:
+                    # Recorded once, so later adds in any worker skip the rels and content types
+                    Document.objects.filter(id=document.id).update(has_comments_rel=True)
             except Exception as docx_e:
                 docx_success = False
                 docx_error = str(docx_e)
-                print(f"Warning: Could not add comment to DOCX file: {docx_e}")
+                logger.warning("Could not add comment to DOCX file: %s", docx_e)
             
             return Response({
                 'id': comment.comment_id,
@@ -1198,218 +1688,196 @@ class AddCommentView(XMLFormattingMixin, APIView):
                 'docx_error': docx_error if not docx_success else None
             })
             
-        except Document.DoesNotExist:
-            return Response({'error': 'Document not found'}, status=status.HTTP_404_NOT_FOUND)
         except Paragraph.DoesNotExist:
-            return Response({'error': 'Paragraph not found'}, status=status.HTTP_404_NOT_FOUND)
+            # Only the miss path pays for telling the 404s apart. A document that
+            # is still parsing has no paragraphs yet, so its status is read here
+            parse_status = Document.objects.filter(id=document_id).values_list('parse_status', flat=True).first()
+            if parse_status is None:
+                return Response({'error': 'Document not found'}, status=status.HTTP_404_NOT_FOUND)
+            return parse_pending_response(parse_status) or Response(
+                {'error': 'Paragraph not found'}, status=status.HTTP_404_NOT_FOUND
+            )
         except Exception as e:
-            print(f"Error adding comment: {e}")
+            logger.exception("Error adding comment")
             return Response({'error': f'Error adding comment: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    def add_comment_to_docx(self, file_path, paragraph_id, comment_id, author, text):
-        try:
-            # Create a backup
-            backup_path = file_path + '.backup'
-            shutil.copy2(file_path, backup_path)
-            
-            # Extract the DOCX
-            temp_dir = file_path + '_temp'
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-            
-            namespaces = {
-                'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+    def add_comment_to_docx(self, file_path, paragraph_id, comment_id, author, text, comments_wired=False):
+        # Rels and content types were ensured by an earlier comment add if the
+        # document records it (comments_wired, from Document.has_comments_rel) or
+        # the file is unchanged since the last add in this process; then only
+        # comments.xml and document.xml are needed
+        wired = comments_wired or _file_cache_get(_COMMENTS_WIRED_CACHE, file_path) == self._file_key(file_path)
+        members = ('word/comments.xml',)
+        if not wired:
+            members += ('word/_rels/document.xml.rels', '[Content_Types].xml')
+        
+        # Read just the parts a comment touches; nothing is extracted to disk
+        with zipfile.ZipFile(file_path, 'r') as zip_ref:
+            parts = {
+                member: zip_ref.read(member) if member in zip_ref.NameToInfo else None
+                for member in members
             }
-            
-            # Register namespace
-            ET.register_namespace('w', 'http://schemas.openxmlformats.org/wordprocessingml/2006/main')
-            
-            # Update or create comments.xml
-            comments_path = os.path.join(temp_dir, 'word', 'comments.xml')
-            
-            if os.path.exists(comments_path):
-                # Load existing comments
-                tree = ET.parse(comments_path)
-                root = tree.getroot()
+        
+        # New comments always go last, so the rendered element is spliced in
+        # before </w:comments> without parsing the comments already there
+        comment_xml = self.render_comment_xml(comment_id, author, text)
+        comments_xml = parts['word/comments.xml']
+        
+        if comments_xml is None:
+            # Create new comments.xml
+            comments_xml = (
+                XML_DECLARATION + b'<w:comments xmlns:w="' + W_NS.encode() + b'">'
+                + comment_xml + b'</w:comments>'
+            )
+        else:
+            end = comments_xml.rfind(b'</w:comments>')
+            if end != -1:
+                comments_xml = comments_xml[:end] + comment_xml + comments_xml[end:]
             else:
-                # Create new comments.xml
-                root = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}comments')
-                tree = ET.ElementTree(root)
-                
-                # Ensure word directory exists
-                os.makedirs(os.path.join(temp_dir, 'word'), exist_ok=True)
-            
-            # Create new comment element
-            comment_elem = ET.SubElement(root, '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}comment')
-            comment_elem.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id', str(comment_id))
-            comment_elem.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}author', author)
-            comment_elem.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}date', datetime.now().isoformat())
-            
-            # Add comment text
-            p_elem = ET.SubElement(comment_elem, '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}p')
-            r_elem = ET.SubElement(p_elem, '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}r')
-            t_elem = ET.SubElement(r_elem, '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t')
-            t_elem.text = text
-            
-            # Write XML with proper formatting
-            self._write_xml_with_proper_formatting(tree, comments_path)
-            
-            # Update document.xml to add comment reference
-            self.add_comment_reference_to_document(temp_dir, paragraph_id, comment_id)
-            
+                # Unusual serialization (self-closed root or another prefix): append via the tree
+                root = etree.fromstring(comments_xml, XML_PARSER)
+                root.append(etree.fromstring(
+                    b'<w:comments xmlns:w="' + W_NS.encode() + b'">' + comment_xml + b'</w:comments>'
+                )[0])
+                comments_xml = self._serialize_xml(root)
+        
+        modified_members = {'word/comments.xml': comments_xml}
+        
+        if not wired:
             # Update relationships if needed
-            self.ensure_comments_relationship(temp_dir)
+            rels_xml = self.ensure_comments_relationship(parts['word/_rels/document.xml.rels'])
+            if rels_xml is not None:
+                modified_members['word/_rels/document.xml.rels'] = rels_xml
             
             # Ensure comments content type is registered
-            self.ensure_comments_content_type(temp_dir)
-            
-            # Recreate the DOCX file with proper XML formatting for ALL files
-            self._recreate_docx_with_proper_xml_formatting(file_path, temp_dir)
-            
-            shutil.rmtree(temp_dir)
-            os.remove(backup_path)
-            
-        except Exception as e:
-            # Restore backup if something went wrong
-            if os.path.exists(backup_path):
-                shutil.copy2(backup_path, file_path)
-                os.remove(backup_path)
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-            raise e
-
-    def add_comment_reference_to_document(self, temp_dir, paragraph_id, comment_id):
-        document_path = os.path.join(temp_dir, 'word', 'document.xml')
-        
-        if not os.path.exists(document_path):
-            return
-        
-        ET.register_namespace('w', 'http://schemas.openxmlformats.org/wordprocessingml/2006/main')
+            content_types_xml = self.ensure_comments_content_type(parts['[Content_Types].xml'])
+            if content_types_xml is not None:
+                modified_members['[Content_Types].xml'] = content_types_xml
         
-        tree = ET.parse(document_path)
-        root = tree.getroot()
+        # Update document.xml to add comment reference. The target is found through
+        # the cached positions of the text paragraphs rather than by counting
+        def anchor(root):
+            paragraphs = self._paragraphs_xpath(root)
+            positions = self._text_paragraph_positions(file_path, 'all', paragraphs)
+            if 0 < paragraph_id <= len(positions):
+                self._anchor_comment(paragraphs[positions[paragraph_id - 1]], comment_id)
+            return positions
         
-        namespaces = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
+        # Swap in the edited parts; every other member is copied through untouched
+        positions = self._mutate_document(file_path, anchor, modified_members)
+        _file_cache_put(_COMMENTS_WIRED_CACHE, file_path, self._file_key(file_path))
+        # Anchors carry no text, so every paragraph keeps its position
+        self._store_paragraph_positions(file_path, 'all', positions)
+
+    def render_comment_xml(self, comment_id, author, text):
+        """Render one <w:comment> element as UTF-8 bytes, using the w: prefix"""
+        return (
+            f'<w:comment w:id="{comment_id}" w:author={quoteattr(author)} w:date="{datetime.now().isoformat()}">'
+            f'<w:p><w:r><w:t>{escape(text)}</w:t></w:r></w:p></w:comment>'
+        ).encode('utf-8')
+
+    def _anchor_comment(self, para, comment_id):
+        """Wrap a <w:p> in a comment range and append the comment reference run"""
+        # Only paragraphs with a run get anchored
+        if next(para.iter(R_TAG), None) is None:
+            return
         
-        # Find the target paragraph
-        paragraphs = root.findall('.//w:p', namespaces)
-        paragraph_counter = 0
+        # New nodes are made in the paragraph's own document
+        # (makeelement/SubElement), so lxml never has to adopt them
+        # Add comment range start
+        comment_start = para.makeelement(COMMENT_RANGE_START_TAG, {W_ID: str(comment_id)})
+        para.insert(0, comment_start)
         
-        for para in paragraphs:
-            # Check if paragraph has text content
-            para_text = ""
-            for t in para.findall('.//w:t', namespaces):
-                if t.text:
-                    para_text += t.text
-            
-            if para_text.strip():
-                paragraph_counter += 1
-                
-                if paragraph_counter == paragraph_id:
-                    # Find the first run in the paragraph
-                    first_run = para.find('.//w:r', namespaces)
-                    if first_run is not None:
-                        # Add comment range start
-                        comment_start = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}commentRangeStart')
-                        comment_start.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id', str(comment_id))
-                        para.insert(0, comment_start)
-                        
-                        # Add comment range end
-                        comment_end = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}commentRangeEnd')
-                        comment_end.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id', str(comment_id))
-                        para.append(comment_end)
-                        
-                        # Add comment reference
-                        comment_ref_run = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}r')
-                        comment_ref = ET.SubElement(comment_ref_run, '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}commentReference')
-                        comment_ref.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id', str(comment_id))
-                        para.append(comment_ref_run)
-                    
-                    break
+        # Add comment range end
+        etree.SubElement(para, COMMENT_RANGE_END_TAG, {W_ID: str(comment_id)})
         
-        tree.write(document_path, encoding='utf-8', xml_declaration=True)
+        # Add comment reference
+        comment_ref_run = etree.SubElement(para, R_TAG)
+        etree.SubElement(comment_ref_run, COMMENT_REFERENCE_TAG, {W_ID: str(comment_id)})
 
-    def ensure_comments_relationship(self, temp_dir):
-        rels_path = os.path.join(temp_dir, 'word', '_rels', 'document.xml.rels')
-        
-        if not os.path.exists(rels_path):
-            # Create the _rels directory and file if it doesn't exist
-            os.makedirs(os.path.dirname(rels_path), exist_ok=True)
-            
-            # Create basic relationships file
-            rels_root = ET.Element('Relationships')
-            rels_root.set('xmlns', 'http://schemas.openxmlformats.org/package/2006/relationships')
-        else:
-            tree = ET.parse(rels_path)
-            rels_root = tree.getroot()
+    def ensure_comments_relationship(self, rels_xml):
+        """Return document.xml.rels bytes with a comments relationship, or None if it already has one"""
+        if rels_xml is None:
+            # Create basic relationships file: nothing to scan or serialize, the
+            # bytes are the fixed header, the one entry and the footer
+            return RELS_HEADER + COMMENTS_REL_XML % 1 + RELS_FOOTER
         
-        comments_rel_exists = False
-        for rel in rels_root.findall('.//{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'):
+        # One streaming pass: stop as soon as a comments relationship turns up,
+        # without building the rest of the tree; otherwise track the highest rIdN
+        max_id = 0
+        context = etree.iterparse(
+            BytesIO(rels_xml), events=('end',), tag=REL_TAG,
+            remove_blank_text=True, resolve_entities=False,
+        )
+        for _, rel in context:
             if rel.get('Target') == 'comments.xml':
-                comments_rel_exists = True
-                break
+                return None
+            rid_match = REL_ID_RE.fullmatch(rel.get('Id', ''))
+            if rid_match is not None:
+                max_id = max(max_id, int(rid_match.group(1)))
         
-        if not comments_rel_exists:
-            rel_elem = ET.SubElement(rels_root, '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship')
-            # Generate a unique relationship ID
-            existing_ids = [rel.get('Id', '') for rel in rels_root.findall('.//{http://schemas.openxmlformats.org/package/2006/relationships}Relationship')]
-            rel_id = f"rId{max([int(rid[3:]) for rid in existing_ids if rid.startswith('rId') and rid[3:].isdigit()] + [0]) + 1}"
-            
-            rel_elem.set('Id', rel_id)
-            rel_elem.set('Type', 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments')
-            rel_elem.set('Target', 'comments.xml')
-            
-            # Save the relationships file
-            ET.register_namespace('', 'http://schemas.openxmlformats.org/package/2006/relationships')
-            tree = ET.ElementTree(rels_root)
-            self._write_xml_with_proper_formatting(tree, rels_path)
+        # The new relationship goes last, so it is spliced in before
+        # </Relationships> and the existing bytes are kept as they are
+        end = rels_xml.rfind(RELS_FOOTER)
+        if end != -1:
+            return rels_xml[:end] + COMMENTS_REL_XML % (max_id + 1) + rels_xml[end:]
+        
+        # Unusual serialization (self-closed root or a prefix): extend the parsed tree
+        rels_root = context.root
+        rel_elem = etree.SubElement(rels_root, REL_TAG)
+        # Generate a unique relationship ID
+        rel_id = f"rId{max_id + 1}"
+        
+        rel_elem.set('Id', rel_id)
+        rel_elem.set('Type', COMMENTS_REL_TYPE)
+        rel_elem.set('Target', 'comments.xml')
+        
+        return self._serialize_xml(rels_root)
 
-    def ensure_comments_content_type(self, temp_dir):
-        """Ensure comments.xml is registered in [Content_Types].xml"""
-        content_types_path = os.path.join(temp_dir, '[Content_Types].xml')
+    def ensure_comments_content_type(self, content_types_xml):
+        """Return [Content_Types].xml bytes registering comments.xml, or None if nothing changed"""
+        if content_types_xml is None:
+            return None
         
-        if not os.path.exists(content_types_path):
-            return
+        # A part that never mentions /word/comments.xml can't have the override,
+        # so the check is skipped and the new entry spliced in before </Types>
+        end = content_types_xml.rfind(b'</Types>')
+        if end != -1 and b'/word/comments.xml' not in content_types_xml:
+            override_xml = b'<Override PartName="/word/comments.xml" ContentType="%s"/>' % COMMENTS_CONTENT_TYPE.encode()
+            return content_types_xml[:end] + override_xml + content_types_xml[end:]
         
         try:
-            tree = ET.parse(content_types_path)
-            root = tree.getroot()
+            root = etree.fromstring(content_types_xml, XML_PARSER)
             
             # Check if comments content type already exists
-            namespaces = {'ct': 'http://schemas.openxmlformats.org/package/2006/content-types'}
-            existing = root.find(".//ct:Override[@PartName='/word/comments.xml']", namespaces)
-            
-            if existing is None:
+            if not self._comments_override_xpath(root):
                 # Add the comments content type
-                override_elem = ET.SubElement(root, '{http://schemas.openxmlformats.org/package/2006/content-types}Override')
+                override_elem = etree.SubElement(root, CT_OVERRIDE_TAG)
                 override_elem.set('PartName', '/word/comments.xml')
-                override_elem.set('ContentType', 'application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml')
+                override_elem.set('ContentType', COMMENTS_CONTENT_TYPE)
                 
-                # Save the content types file
-                ET.register_namespace('', 'http://schemas.openxmlformats.org/package/2006/content-types')
-                self._write_xml_with_proper_formatting(tree, content_types_path)
+                return self._serialize_xml(root)
                 
         except Exception as e:
-            print(f"Error updating content types: {e}")
+            logger.warning("Error updating content types: %s", e)
+        
+        return None
 
 
 @method_decorator(csrf_exempt, name='dispatch')
 class DeleteCommentView(XMLFormattingMixin, APIView):
     def delete(self, request):
-        # Parse JSON data from request body for DELETE requests
+        # DRF has normally parsed the DELETE body already; only JSON sent with a
+        # content type no parser accepts is decoded by hand (the body is still unread then)
         try:
-            import json
-            data = json.loads(request.body.decode('utf-8'))
-            document_id = data.get('document_id')
-            comment_id = data.get('comment_id')
-        except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
-            # Fallback to request.data if JSON parsing fails
             try:
                 data = request.data
-                document_id = data.get('document_id')
-                comment_id = data.get('comment_id')
-            except (AttributeError, ValueError) as e:
-                return Response({'error': 'Invalid JSON in request data'}, status=status.HTTP_400_BAD_REQUEST)
+            except UnsupportedMediaType:
+                data = json.loads(request.body)
+            document_id = data.get('document_id')
+            comment_id = data.get('comment_id')
+        except (ParseError, ValueError, AttributeError):
+            return Response({'error': 'Invalid JSON in request data'}, status=status.HTTP_400_BAD_REQUEST)
         
         if document_id is None or comment_id is None:
             error_msg = f'Missing required fields: document_id={document_id}, comment_id={comment_id}'
@@ -1420,7 +1888,7 @@ class DeleteCommentView(XMLFormattingMixin, APIView):
             comment = Comment.objects.get(document=document, comment_id=comment_id)
             
             # Delete comment from DOCX file first
-            self.delete_comment_from_docx(document.file_path, comment_id)
+            _run_docx_write(self.delete_comment_from_docx, document.file_path, comment_id)
             
             # Delete comment from database
             comment.delete()
@@ -1435,77 +1903,112 @@ class DeleteCommentView(XMLFormattingMixin, APIView):
         except Comment.DoesNotExist:
             return Response({'error': 'Comment not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
-            print(f"Error deleting comment: {e}")
+            logger.exception("Error deleting comment")
             return Response({'error': f'Error deleting comment: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class DocumentListPagination(LimitOffsetPagination):
+    """Limit/offset pages for the document list, with the page size capped.
+
+    No default_limit: requests without ?limit= still get the full list, which
+    the editor and commenter front ends expect. A client asking for a page can
+    never ask for more than max_limit rows at once.
+    """
+    max_limit = 100
+
+
 class ListDocumentsView(APIView):
+    # Opt-in: clients that pass ?limit=&offset= get a page, others still get the full list
+    pagination_class = DocumentListPagination
+    # The full list is read and written this many rows at a time
+    STREAM_CHUNK_SIZE = 500
+
     def get(self, request):
         # Show all documents in both interfaces
-        documents = Document.objects.all()
-            
-        # Add comment count and order by upload date
-        documents = documents.annotate(comment_count=Count('comments')).order_by('-uploaded_at')
-        
-        documents_data = []
-        for doc in documents:
-            documents_data.append({
-                'id': doc.id,
-                'filename': doc.filename,
-                'uploaded_at': doc.uploaded_at.isoformat(),
-                'comment_count': doc.comment_count,
-                # Version information
-                'version_number': doc.version_number,
-                'version_status': doc.version_status,
-                'is_original': doc.version_number == 1,
-                'parent_document_id': doc.parent_document.id if doc.parent_document else None,
-                'base_document_id': doc.base_document.id if doc.base_document else doc.id,
-                'created_from_comments': doc.created_from_comments,
-                'version_notes': doc.version_notes
-            })
+        # Add comment count and order by upload date; rows come back as plain
+        # dicts, so no Document instance is built per row
+        documents = Document.objects.annotate(
+            comment_count=Count('comments'),
+            base_id=Coalesce('base_document_id', 'id'),
+        ).order_by('-uploaded_at').values(
+            'id', 'filename', 'uploaded_at', 'comment_count', 'version_number',
+            'version_status', 'parent_document_id', 'base_id',
+            'created_from_comments', 'version_notes',
+        )
+        
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(documents, request, view=self)
         
-        return Response(documents_data)
+        if page is None:
+            # The full list is streamed off a chunked iterator, like GetDocumentView,
+            # so neither the rows nor the JSON text is held whole
+            return StreamingHttpResponse(self._stream_documents_json(documents), content_type='application/json')
+        return paginator.get_paginated_response([self._document_item(doc) for doc in page])
+    
+    def _stream_documents_json(self, documents):
+        items = (self._document_item(doc) for doc in documents.iterator(chunk_size=self.STREAM_CHUNK_SIZE))
+        yield '['
+        yield from _stream_json_items(items, self.STREAM_CHUNK_SIZE)
+        yield ']'
+    
+    def _document_item(self, doc):
+        return {
+            'id': doc['id'],
+            'filename': doc['filename'],
+            'uploaded_at': doc['uploaded_at'].isoformat(),
+            'comment_count': doc['comment_count'],
+            # Version information
+            'version_number': doc['version_number'],
+            'version_status': doc['version_status'],
+            'is_original': doc['version_number'] == 1,
+            'parent_document_id': doc['parent_document_id'],
+            'base_document_id': doc['base_id'],
+            'created_from_comments': doc['created_from_comments'],
+            'version_notes': doc['version_notes']
+        }
 
 class ExportDocumentView(APIView):
     def get(self, request, document_id):
         try:
             document = Document.objects.get(id=document_id)
-            print(f"Exporting document {document_id}: {document.filename}")
-            print(f"File path: {document.file_path}")
-            print(f"Version number: {document.version_number}")
-            print(f"Version status: {document.version_status}")
-            print(f"Is base document: {document.base_document is None}")
-            
-            # Check if file exists and get basic info
-            if os.path.exists(document.file_path):
-                file_size = os.path.getsize(document.file_path)
-                file_mtime = os.path.getmtime(document.file_path)
-                print(f"File size: {file_size} bytes")
-                print(f"Last modified: {datetime.fromtimestamp(file_mtime)}")
-                
-                # Quick check if file is valid DOCX
-                try:
-                    with zipfile.ZipFile(document.file_path, 'r') as test_zip:
-                        file_list = test_zip.namelist()
-                        print(f"DOCX contains {len(file_list)} files")
-                        if 'word/document.xml' in file_list:
-                            print("✓ Valid DOCX structure detected")
-                        else:
-                            print("⚠ Missing document.xml - file may be corrupted")
-                except Exception as zip_error:
-                    print(f"⚠ DOCX file validation failed: {zip_error}")
-            else:
-                print(f"❌ File not found at: {document.file_path}")
+            not_ready = parse_pending_response(document.parse_status)
+            if not_ready:
+                return not_ready
+            
+            # The base_document_id column answers "is base" without loading the parent row
+            logger.debug(
+                "Exporting document %s: %s (path %s, v%s, %s, base document: %s)",
+                document_id, document.filename, document.file_path,
+                document.version_number, document.version_status, document.base_document_id is None,
+            )
+            
+            # Check if file exists and get basic info (diagnostics only, so only
+            # when debug logging is on; otherwise no stat or zip check is made)
+            if logger.isEnabledFor(logging.DEBUG):
+                if os.path.exists(document.file_path):
+                    file_size = os.path.getsize(document.file_path)
+                    file_mtime = os.path.getmtime(document.file_path)
+                    logger.debug("File size: %s bytes, last modified: %s", file_size, datetime.fromtimestamp(file_mtime))
+                    
+                    # Quick check if file is valid DOCX (cached until the file changes)
+                    try:
+                        has_document_xml, file_count = _validate_docx(document.file_path, file_mtime, file_size)
+                        logger.debug("DOCX contains %s files", file_count)
+                        if not has_document_xml:
+                            logger.debug("Missing document.xml - file may be corrupted")
+                    except Exception as zip_error:
+                        logger.debug("DOCX file validation failed: %s", zip_error)
+                else:
+                    logger.debug("File not found at: %s", document.file_path)
                 
             # Check if we should rebuild the DOCX from database (sync option)
             sync_with_db = request.GET.get('sync', '').lower() in ['true', '1', 'yes']
             if sync_with_db:
-                print("🔄 Rebuilding DOCX from database content...")
                 try:
                     self._rebuild_docx_from_database(document)
-                    print("✅ DOCX rebuilt successfully from database")
+                    logger.debug("DOCX for document %s rebuilt from database", document_id)
                 except Exception as rebuild_error:
-                    print(f"❌ Failed to rebuild DOCX: {rebuild_error}")
+                    logger.error("Failed to rebuild DOCX for document %s: %s", document_id, rebuild_error)
                     # Continue with export even if rebuild fails
                 
             # Generate version-aware filename
@@ -1526,45 +2029,50 @@ class ExportDocumentView(APIView):
                 else:
                     export_filename = base_filename
             
-            print(f"Export filename: {export_filename}")
+            logger.debug("Export filename: %s", export_filename)
             
             if not document.file_path:
                 return Response({'error': 'No file path saved for document'}, status=status.HTTP_404_NOT_FOUND)
-                return Response({'error': 'No file path saved for document'}, status=status.HTTP_404_NOT_FOUND)
             
-            if os.path.exists(document.file_path):
-                try:
-                    file = open(document.file_path, 'rb')
-                    response = FileResponse(
-                        file,
-                        as_attachment=True,
-                        filename=export_filename,
-                        content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-                    )
-                    return response
-                except PermissionError as e:
-                    print(f"Permission error: {str(e)}")
-                    return Response({'error': f'Permission denied: {str(e)}'}, status=status.HTTP_403_FORBIDDEN)
-                except Exception as e:
-                    print(f"File open error: {str(e)}")
-                    return Response({'error': f'Error opening file: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            else:
-                print(f"File not found at path: {document.file_path}")
+            # A write in progress on the file lands before it is read
+            _wait_for_docx_writes(document.file_path)
+            
+            try:
+                # Unbuffered: FileResponse reads whole blocks itself, and servers with
+                # wsgi.file_wrapper sendfile() straight from the descriptor. A missing
+                # file surfaces here, so there's no separate exists() stat
+                file = open(document.file_path, 'rb', buffering=0)
+            except FileNotFoundError:
+                logger.warning("File not found at path: %s", document.file_path)
                 return Response({
                     'error': f'File not found at path: {document.file_path}'
                 }, status=status.HTTP_404_NOT_FOUND)
+            except PermissionError as e:
+                logger.error("Permission error opening %s: %s", document.file_path, e)
+                return Response({'error': f'Permission denied: {str(e)}'}, status=status.HTTP_403_FORBIDDEN)
+            except Exception as e:
+                logger.error("File open error for %s: %s", document.file_path, e)
+                return Response({'error': f'Error opening file: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            
+            # FileResponse sets Content-Length from the open file, so the response isn't chunked
+            response = FileResponse(
+                file,
+                as_attachment=True,
+                filename=export_filename,
+                content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+            )
+            response.block_size = FILE_RESPONSE_BLOCK_SIZE
+            return response
                 
         except Document.DoesNotExist:
-            print(f"Document {document_id} not found in database")
+            logger.debug("Document %s not found in database", document_id)
             return Response({'error': 'Document not found in database'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
-            print(f"Unexpected error in export: {str(e)}")
+            logger.exception("Unexpected error in export")
             return Response({'error': f'Export error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     def _rebuild_docx_from_database(self, document):
         """Rebuild the DOCX file content from the current database state"""
-        from docx import Document as DocxDocument
-        
         # Create a new DOCX document
         new_doc = DocxDocument()
         
@@ -1578,10 +2086,11 @@ class ExportDocumentView(APIView):
         for para in paragraphs:
             if para.html_content and para.html_content.strip():
                 # Handle HTML content - extract text for now (could be enhanced for formatting)
-                from html import unescape
-                import re
-                text_content = re.sub('<[^<]+?>', '', para.html_content)
-                text_content = unescape(text_content).strip()
+                text_content = HTML_TAG_RE.sub('', para.html_content)
+                if '&' in text_content:
+                    # Only entity-bearing text needs the full unescape scan
+                    text_content = unescape(text_content)
+                text_content = text_content.strip()
             else:
                 text_content = para.text or ''
             
@@ -1590,78 +2099,81 @@ class ExportDocumentView(APIView):
             else:
                 new_doc.add_paragraph('')  # Keep empty paragraphs
         
-        # Save to the document's file path
-        backup_path = document.file_path + '.backup'
-        if os.path.exists(document.file_path):
-            shutil.copy2(document.file_path, backup_path)
+        # Build the package in memory, then land it next to the document in one
+        # write and swap it in; the original stays the backup until os.replace
+        # succeeds, so nothing is copied up front
+        buffer = BytesIO()
+        new_doc.save(buffer)
         
-        try:
-            new_doc.save(document.file_path)
-            # Remove backup if successful
-            if os.path.exists(backup_path):
-                os.remove(backup_path)
-        except Exception as e:
-            # Restore backup if save failed
-            if os.path.exists(backup_path):
-                shutil.copy2(backup_path, document.file_path)
-                os.remove(backup_path)
-            raise e
+        _run_docx_write(_replace_file_bytes, document.file_path, buffer.getbuffer())
+        
+        # The rebuilt package has no comments part, so the next comment add wires it again
+        if document.has_comments_rel:
+            Document.objects.filter(id=document.id).update(has_comments_rel=False)
+            document.has_comments_rel = False
 
 
 class GetDocumentView(APIView):
+    # Rows are read from the database and written to the response this many at
+    # a time, so a large document is never held as one list or one JSON string
+    STREAM_CHUNK_SIZE = 1000
+    
     def get(self, request, document_id):
         try:
             document = Document.objects.get(id=document_id)
-            
-            paragraphs_data = []
-            for para in document.paragraphs.all().order_by('paragraph_id'):
-                para_data = {
-                    'id': para.paragraph_id,
-                    'text': para.text,
-                    'html_content': para.html_content,
-                    'has_images': para.has_images
-                }
-                
-                # Add image information if paragraph has images
-                if para.has_images:
-                    images = []
-                    for para_img in para.paragraph_images.all():
-                        images.append({
-                            'id': para_img.document_image.id,
-                            'filename': para_img.document_image.filename,
-                            'image_id': para_img.document_image.image_id,
-                            'position': para_img.position_in_paragraph
-                        })
-                    para_data['images'] = images
-                
-                paragraphs_data.append(para_data)
-            
-            comments_data = []
-            for comment in document.comments.all():
-                comments_data.append({
-                    'id': comment.comment_id,
-                    'author': comment.author,
-                    'text': comment.text,
-                    'paragraph_id': comment.paragraph.paragraph_id
-                })
-            
-            return Response({
-                'document_id': document.id,
-                'filename': document.filename,
-                'version_number': document.version_number,
-                'version_status': document.version_status,
-                'created_from_comments': document.created_from_comments,
-                'parent_document_id': document.parent_document.id if document.parent_document else None,
-                'base_document_id': document.base_document.id if document.base_document else document.id,
-                'version_notes': document.version_notes,
-                'edited_commented_paragraphs': document.edited_commented_paragraphs,
-                'uploaded_at': document.uploaded_at.isoformat(),
-                'paragraphs': paragraphs_data,
-                'comments': comments_data
-            })
-            
         except Document.DoesNotExist:
             return Response({'error': 'Document not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        return StreamingHttpResponse(self._stream_document_json(document), content_type='application/json')
+    
+    def _stream_document_json(self, document):
+        """Yield the document JSON piece by piece: metadata, then paragraphs, then comments"""
+        header = _compact_json_dumps({
+            'document_id': document.id,
+            'filename': document.filename,
+            'version_number': document.version_number,
+            'version_status': document.version_status,
+            'created_from_comments': document.created_from_comments,
+            'parent_document_id': document.parent_document_id,
+            'base_document_id': document.base_document_id or document.id,
+            'version_notes': document.version_notes,
+            'edited_commented_paragraphs': document.edited_commented_paragraphs,
+            'uploaded_at': document.uploaded_at.isoformat(),
+            'parse_status': document.parse_status,
+        })
+        # Reopen the object to append the two arrays
+        yield header[:-1] + ',"paragraphs":['
+        yield from _stream_json_items(self._paragraph_items(document), self.STREAM_CHUNK_SIZE)
+        yield '],"comments":['
+        yield from _stream_json_items(self._comment_items(document), self.STREAM_CHUNK_SIZE)
+        yield ']}'
+    
+    def _paragraph_items(self, document):
+        # Images come from one query for the whole document
+        return paragraph_payloads(document, chunk_size=self.STREAM_CHUNK_SIZE)
+    
+    def _comment_items(self, document):
+        # Only the fields returned; the paragraph number comes from the join
+        comments = Comment.objects.filter(document=document).values(
+            'comment_id', 'author', 'text', 'paragraph__paragraph_id'
+        )
+        for comment in comments.iterator(chunk_size=self.STREAM_CHUNK_SIZE):
+            yield {
+                'id': comment['comment_id'],
+                'author': comment['author'],
+                'text': comment['text'],
+                'paragraph_id': comment['paragraph__paragraph_id']
+            }
+
+
+class DocumentParseStatusView(APIView):
+    """Parse status of an uploaded document, polled after a background upload"""
+    
+    def get(self, request, document_id):
+        parse_status = Document.objects.filter(id=document_id).values_list('parse_status', flat=True).first()
+        if parse_status is None:
+            return Response({'error': 'Document not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'document_id': document_id, 'parse_status': parse_status})
 
 
 class ServeImageView(APIView):
@@ -1670,14 +2182,15 @@ class ServeImageView(APIView):
         try:
             image = DocumentImage.objects.get(id=image_id)
             
-            if os.path.exists(image.file_path):
-                response = FileResponse(
-                    open(image.file_path, 'rb'),
-                    content_type=image.content_type
-                )
-                return response
-            else:
+            # One open attempt instead of an exists() stat followed by the open
+            try:
+                image_file = open(image.file_path, 'rb')
+            except FileNotFoundError:
                 return Response({'error': 'Image file not found'}, status=status.HTTP_404_NOT_FOUND)
+            
+            response = FileResponse(image_file, content_type=image.content_type)
+            response.block_size = FILE_RESPONSE_BLOCK_SIZE
+            return response
                 
         except DocumentImage.DoesNotExist:
             return Response({'error': 'Image not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -1702,12 +2215,68 @@ except ImportError:
     ML_DEPENDENCIES_AVAILABLE = False
 
 
+@lru_cache(maxsize=1)
+def get_compliance_model():
+    """Resolve the compliance model once per process, as a (model, model_type) pair
+
+    Loaded lazily on the first check rather than at import, so migrations and
+    other management commands never load or train a model. Call
+    get_compliance_model.cache_clear() after swapping models in-process.
+    """
+    # Try advanced ML system first
+    if ML_FULL_SYSTEM_AVAILABLE and ML_DEPENDENCIES_AVAILABLE:
+        ml_model = get_or_create_default_model()
+        if ml_model is not None:
+            return ml_model, 'advanced_ml'
+    
+    # Fallback to basic system
+    return get_basic_compliance_model(), 'basic'
+
+
+# Real-time results keyed by (model_type, original, comment, edited). Typing
+# resends the same texts, and backspace/undo revisit earlier ones, so repeats
+# skip the model. Bounded LRU: the least recently used entry is evicted first.
+_REALTIME_RESULT_CACHE = OrderedDict()
+_REALTIME_RESULT_CACHE_SIZE = 4096
+_realtime_result_lock = threading.Lock()
+
+# Real-time inference runs on a small shared pool. That bounds how many run
+# at once, and a request waits at most REALTIME_ML_TIMEOUT seconds before
+# answering 'pending'. The late result still lands in the cache for the next
+# keystroke.
+_ml_inference_pool = ThreadPoolExecutor(
+    max_workers=min(4, os.cpu_count() or 1), thread_name_prefix='ml-inference'
+)
+REALTIME_ML_TIMEOUT = 2.0
+
+# Predictions already running, by the same keys as _REALTIME_RESULT_CACHE, so a
+# burst of identical requests waits on one inference instead of starting its
+# own. Entries are dropped as soon as their results are cached (or fail).
+_REALTIME_INFLIGHT = {}
+
+# Placeholder results for comments the model didn't score: no edit yet, the
+# shared deadline passed, or the check failed. They are built once and the same
+# dict is handed out for every such comment, so callers must treat them as
+# read-only (post() only copies their fields into the response).
+_UNCHANGED_RESULT = {'prediction': 'pending', 'compliance_score': 0.0, 'confidence': 1.0, 'model_type': 'unchanged'}
+_TIMEOUT_RESULT = {'prediction': 'pending', 'compliance_score': 0.0, 'confidence': 0.0, 'model_type': 'timeout'}
+_ERROR_FALLBACK_RESULT = {'prediction': 'pending', 'compliance_score': 0.0, 'confidence': 0.0, 'model_type': 'error_fallback'}
+
+
 class CheckEditComplianceRealTimeView(APIView):
     """
     Real-time ML compliance checking for live editing feedback
     This endpoint is called while the user is typing to provide instant feedback
     """
     
+    # Overall status is the most restrictive per-comment status; rank them once
+    # so each comment costs one dict lookup and an int compare. Anything else
+    # (e.g. 'pending' from the error fallback) doesn't affect the overall status.
+    _STATUS_SEVERITY = {'compliant': 0, 'partial': 1, 'non_compliant': 2}
+    _SEVERITY_STATUS = ('compliant', 'partial', 'non_compliant')
+    
+    renderer_classes = [FastJSONRenderer]
+    
     def post(self, request):
         # Extract input data
         paragraph_id = request.data.get('paragraph_id')
@@ -1720,66 +2289,57 @@ class CheckEditComplianceRealTimeView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            # Get document and paragraph
-            document = Document.objects.get(id=document_id)
-            paragraph = Paragraph.objects.get(document=document, paragraph_id=paragraph_id)
+            # Get the paragraph by its document's id; no separate Document query
+            paragraph = Paragraph.objects.get(document_id=document_id, paragraph_id=paragraph_id)
             
-            # Get original text and all comments for this paragraph
+            # Get original text and all comments for this paragraph, fetched once
+            # as plain dicts; only these three fields are read
             original_text = paragraph.text or ""
-            comments = Comment.objects.filter(paragraph=paragraph)
+            comments = list(
+                Comment.objects.filter(paragraph=paragraph).values('comment_id', 'text', 'scheduled_deletion_at')
+            )
             
-            if not comments.exists():
+            if not comments:
                 return Response({
                     'message': 'No comments found for this paragraph',
                     'compliance_results': []
                 })
             
-            # Check compliance against all comments in real-time
-            compliance_results = []
-            overall_status = 'compliant'  # Start optimistic
+            # Check compliance against all comments in real-time, in one batched model call
+            ml_results = self.check_comments_compliance_realtime(
+                original_text, [comment['text'] for comment in comments], current_text
+            )
             
-            for comment in comments:
-                try:
-                    # Use the same ML checking method as edit paragraph
-                    ml_result = self.check_comment_compliance_realtime(original_text, comment.text, current_text)
-                    
-                    result_data = {
-                        'comment_id': comment.comment_id,
-                        'comment_text': comment.text,
-                        'status': ml_result['prediction'],
-                        'score': ml_result['compliance_score'],
-                        'confidence': ml_result['confidence'],
-                        'model_type': ml_result['model_type'],
-                        'scheduled_deletion_at': comment.scheduled_deletion_at.isoformat() if comment.scheduled_deletion_at else None,
-                        'is_scheduled_for_deletion': comment.scheduled_deletion_at is not None
-                    }
-                    
-                    compliance_results.append(result_data)
-                    
-                    # Determine overall status (most restrictive)
-                    if ml_result['prediction'] == 'non_compliant':
-                        overall_status = 'non_compliant'
-                    elif ml_result['prediction'] == 'partial' and overall_status == 'compliant':
-                        overall_status = 'partial'
+            compliance_results = []
+            overall_severity = 0  # Start optimistic
+            score_total = 0.0
+            scored = 0
+            
+            for comment, ml_result in zip(comments, ml_results):
+                scheduled_deletion_at = comment['scheduled_deletion_at']
+                result_data = {
+                    'comment_id': comment['comment_id'],
+                    'comment_text': comment['text'],
+                    'status': ml_result['prediction'],
+                    'score': ml_result['compliance_score'],
+                    'confidence': ml_result['confidence'],
+                    'model_type': ml_result['model_type'],
+                    'scheduled_deletion_at': scheduled_deletion_at.isoformat() if scheduled_deletion_at else None,
+                    'is_scheduled_for_deletion': scheduled_deletion_at is not None
+                }
                 
-                except Exception as e:
-                    print(f"Real-time compliance check failed for comment {comment.comment_id}: {e}")
-                    compliance_results.append({
-                        'comment_id': comment.comment_id,
-                        'comment_text': comment.text,
-                        'status': 'error',
-                        'score': 0.0,
-                        'confidence': 0.0,
-                        'model_type': 'error',
-                        'scheduled_deletion_at': comment.scheduled_deletion_at.isoformat() if comment.scheduled_deletion_at else None,
-                        'is_scheduled_for_deletion': comment.scheduled_deletion_at is not None
-                    })
+                compliance_results.append(result_data)
+                
+                # Determine overall status (most restrictive)
+                overall_severity = max(overall_severity, self._STATUS_SEVERITY.get(ml_result['prediction'], 0))
+                
+                # Overall compliance averages the positive scores, accumulated in the same pass
+                if ml_result['compliance_score'] > 0:
+                    score_total += ml_result['compliance_score']
+                    scored += 1
             
-            # Calculate overall compliance
-            if compliance_results:
-                avg_score = sum(r['score'] for r in compliance_results if r['score'] > 0) / len([r for r in compliance_results if r['score'] > 0])
-            else:
-                avg_score = 0.0
+            overall_status = self._SEVERITY_STATUS[overall_severity]
+            avg_score = score_total / scored if scored else 0.0
             
             return Response({
                 'overall_status': overall_status,
@@ -1789,68 +2349,99 @@ class CheckEditComplianceRealTimeView(APIView):
                 'can_auto_delete': overall_status == 'compliant' and avg_score >= 0.6
             })
             
-        except Document.DoesNotExist:
-            return Response({'error': 'Document not found'}, status=status.HTTP_404_NOT_FOUND)
         except Paragraph.DoesNotExist:
+            # Only the miss path pays for telling the two 404s apart
+            if not Document.objects.filter(id=document_id).exists():
+                return Response({'error': 'Document not found'}, status=status.HTTP_404_NOT_FOUND)
             return Response({'error': 'Paragraph not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({
                 'error': f'Error during real-time compliance check: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
-    def check_comment_compliance_realtime(self, original_text: str, comment_text: str, edited_text: str):
-        """Check compliance using ML system - optimized for real-time use with consistent thresholds"""
+    def check_comments_compliance_realtime(self, original_text: str, comment_texts: list, edited_text: str):
+        """Check compliance of several comments against one edit with a single predict_batch call"""
+        # Nothing typed yet (or only whitespace): there is no edit to score, so
+        # skip feature extraction and the model entirely
+        if edited_text == original_text or not edited_text.strip():
+            return [_UNCHANGED_RESULT] * len(comment_texts)
+        
         try:
-            # Try advanced ML system first
-            if ML_FULL_SYSTEM_AVAILABLE and ML_DEPENDENCIES_AVAILABLE:
-                ml_model = get_or_create_default_model()
-                if ml_model is not None:
-                    result = ml_model.predict(original_text, comment_text, edited_text)
-                    score = result['compliance_score']
-                    
-                    # Use consistent classification thresholds
-                    if score >= 0.6:
-                        final_status = 'compliant'
-                    elif score >= 0.3:
-                        final_status = 'partial'
+            model, model_type = get_compliance_model()
+            keys = [(model_type, original_text, comment_text, edited_text) for comment_text in comment_texts]
+            
+            cached = [None] * len(keys)
+            waiting = {}  # index -> future whose results include keys[index]
+            
+            with _realtime_result_lock:
+                missing = []
+                for i, key in enumerate(keys):
+                    result = _REALTIME_RESULT_CACHE.get(key)
+                    if result is not None:
+                        _REALTIME_RESULT_CACHE.move_to_end(key)
+                        cached[i] = result
+                    elif key in _REALTIME_INFLIGHT:
+                        # Another request is already scoring this exact text
+                        waiting[i] = _REALTIME_INFLIGHT[key]
                     else:
-                        final_status = 'non_compliant'
-                    
-                    return {
-                        'prediction': final_status,
-                        'compliance_score': score,
-                        'confidence': result['confidence'],
-                        'model_type': 'advanced_ml'
-                    }
+                        missing.append(i)
+                
+                # Only the comments neither cached nor in flight go to the model
+                if missing:
+                    missing_keys = [keys[i] for i in missing]
+                    future = _ml_inference_pool.submit(
+                        self._predict_and_cache, model, model_type, original_text,
+                        [comment_texts[i] for i in missing], edited_text, missing_keys
+                    )
+                    for i, key in zip(missing, missing_keys):
+                        _REALTIME_INFLIGHT[key] = future
+                        waiting[i] = future
             
-            # Fallback to basic system
-            basic_model = get_basic_compliance_model()
-            result = basic_model.predict(original_text, comment_text, edited_text)
-            score = result['compliance_score']
-            
-            # Use consistent classification thresholds for basic model too
-            if score >= 0.6:
-                final_status = 'compliant'
-            elif score >= 0.3:
-                final_status = 'partial'
-            else:
-                final_status = 'non_compliant'
+            deadline = time.monotonic() + REALTIME_ML_TIMEOUT
+            for i, future in waiting.items():
+                try:
+                    cached[i] = future.result(timeout=max(0.0, deadline - time.monotonic()))[keys[i]]
+                except FuturesTimeoutError:
+                    cached[i] = _TIMEOUT_RESULT
             
-            return {
-                'prediction': final_status,
-                'compliance_score': score,
-                'confidence': result['confidence'],
-                'model_type': 'basic'
-            }
+            return cached
             
         except Exception as e:
-            print(f"Real-time ML compliance check failed: {e}")
-            return {
-                'prediction': 'pending',
-                'compliance_score': 0.0,
-                'confidence': 0.0,
-                'model_type': 'error_fallback'
-            }
+            logger.warning("Real-time ML compliance check failed: %s", e)
+            return [_ERROR_FALLBACK_RESULT] * len(comment_texts)
+    
+    def _predict_and_cache(self, model, model_type, original_text, comment_texts, edited_text, keys):
+        """Run one predict_batch on the inference pool; cache and return the results by key"""
+        try:
+            count = len(comment_texts)
+            results = {key: {
+                'prediction': self.status_for_score(result['compliance_score']),
+                'compliance_score': result['compliance_score'],
+                'confidence': result['confidence'],
+                'model_type': model_type
+            } for key, result in zip(
+                keys, model.predict_batch([original_text] * count, comment_texts, [edited_text] * count)
+            )}
+            
+            with _realtime_result_lock:
+                _REALTIME_RESULT_CACHE.update(results)
+                while len(_REALTIME_RESULT_CACHE) > _REALTIME_RESULT_CACHE_SIZE:
+                    _REALTIME_RESULT_CACHE.popitem(last=False)
+            
+            return results
+        finally:
+            with _realtime_result_lock:
+                for key in keys:
+                    _REALTIME_INFLIGHT.pop(key, None)
+    
+    @staticmethod
+    def status_for_score(score):
+        """Use consistent classification thresholds for both models"""
+        if score >= 0.6:
+            return 'compliant'
+        elif score >= 0.3:
+            return 'partial'
+        return 'non_compliant'
 
 
 class CheckEditComplianceView(APIView):
@@ -1858,6 +2449,8 @@ class CheckEditComplianceView(APIView):
     API endpoint to check if an edit complies with a comment
     """
     
+    renderer_classes = [FastJSONRenderer]
+    
     def post(self, request):
         # Extract input data
         original_text = request.data.get('original_text', '')
@@ -1881,9 +2474,10 @@ class CheckEditComplianceView(APIView):
                         # Record start time for performance tracking
                         start_time = time.time()
                         
-                        # Make prediction using advanced ML model
-                        prediction_result = ml_model.predict(original_text, comment_text, edited_text)
-                        explanation = ml_model.explain_prediction(original_text, comment_text, edited_text)
+                        # Make prediction using advanced ML model; features are extracted once for both
+                        prediction_result, explanation = ml_model.predict_with_explanation(
+                            original_text, comment_text, edited_text
+                        )
                         
                         # Calculate processing time
                         processing_time = int((time.time() - start_time) * 1000)  # milliseconds
@@ -1902,7 +2496,7 @@ class CheckEditComplianceView(APIView):
                         
                         return Response(response_data)
                 except Exception as e:
-                    print(f"Warning: Full ML system failed, falling back to basic: {e}")
+                    logger.warning("Full ML system failed, falling back to basic: %s", e)
             
             # Fallback to basic compliance model
             model = get_basic_compliance_model()
@@ -1910,11 +2504,10 @@ class CheckEditComplianceView(APIView):
             # Record start time for performance tracking
             start_time = time.time()
             
-            # Make prediction
-            prediction_result = model.predict(original_text, comment_text, edited_text)
-            
-            # Get explanation
-            explanation = model.explain_prediction(original_text, comment_text, edited_text)
+            # Make prediction and get its explanation from one rules pass
+            prediction_result, explanation = model.predict_with_explanation(
+                original_text, comment_text, edited_text
+            )
             
             # Calculate processing time
             processing_time = int((time.time() - start_time) * 1000)  # milliseconds
@@ -1943,6 +2536,8 @@ class CheckParagraphComplianceView(APIView):
     Check compliance for a specific paragraph that was edited
     """
     
+    renderer_classes = [FastJSONRenderer]
+    
     def post(self, request):
         document_id = request.data.get('document_id')
         paragraph_id = request.data.get('paragraph_id')
@@ -1955,13 +2550,14 @@ class CheckParagraphComplianceView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            document = Document.objects.get(id=document_id)
-            paragraph = Paragraph.objects.get(document=document, paragraph_id=paragraph_id)
+            paragraph = Paragraph.objects.get(document_id=document_id, paragraph_id=paragraph_id)
             
-            # Get all comments for this paragraph
-            comments = Comment.objects.filter(paragraph=paragraph)
+            # Get all comments for this paragraph, fetched once
+            comments = list(
+                Comment.objects.filter(paragraph=paragraph).only('comment_id', 'author', 'text')
+            )
             
-            if not comments.exists():
+            if not comments:
                 return Response({
                     'message': 'No comments found for this paragraph',
                     'compliance_results': []
@@ -1978,8 +2574,7 @@ class CheckParagraphComplianceView(APIView):
             model = get_basic_compliance_model()
             
             for comment in comments:
-                result = model.predict(original_text, comment.text, edited_text)
-                explanation = model.explain_prediction(original_text, comment.text, edited_text)
+                result, explanation = model.predict_with_explanation(original_text, comment.text, edited_text)
                 
                 compliance_results.append({
                     'comment_id': comment.comment_id,
@@ -2007,9 +2602,10 @@ class CheckParagraphComplianceView(APIView):
                 'total_comments_checked': len(compliance_results)
             })
             
-        except Document.DoesNotExist:
-            return Response({'error': 'Document not found'}, status=status.HTTP_404_NOT_FOUND)
         except Paragraph.DoesNotExist:
+            # Only the miss path pays for telling the two 404s apart
+            if not Document.objects.filter(id=document_id).exists():
+                return Response({'error': 'Document not found'}, status=status.HTTP_404_NOT_FOUND)
             return Response({'error': 'Paragraph not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({
@@ -2022,15 +2618,15 @@ class MLModelStatusView(APIView):
     
     def get(self, request):
         try:
-            print(f"DEBUG: ML_FULL_SYSTEM_AVAILABLE = {ML_FULL_SYSTEM_AVAILABLE}")
-            print(f"DEBUG: ML_DEPENDENCIES_AVAILABLE = {ML_DEPENDENCIES_AVAILABLE}")
+            logger.debug("ML_FULL_SYSTEM_AVAILABLE = %s", ML_FULL_SYSTEM_AVAILABLE)
+            logger.debug("ML_DEPENDENCIES_AVAILABLE = %s", ML_DEPENDENCIES_AVAILABLE)
             
             # Check for advanced ML system first
             if ML_FULL_SYSTEM_AVAILABLE and ML_DEPENDENCIES_AVAILABLE:
                 try:
-                    print("DEBUG: Attempting to get advanced ML model...")
+                    logger.debug("Attempting to get advanced ML model...")
                     ml_model = get_or_create_default_model()
-                    print(f"DEBUG: ML model result: {ml_model is not None}")
+                    logger.debug("ML model result: %s", ml_model is not None)
                     if ml_model is not None:
                         return Response({
                             'model_loaded': True,
@@ -2040,10 +2636,10 @@ class MLModelStatusView(APIView):
                             'description': 'Full ML system with RandomForest classifier and 20+ features for accurate compliance prediction'
                         })
                 except Exception as e:
-                    print(f"DEBUG: Advanced ML system failed: {e}")
+                    logger.debug("Advanced ML system failed: %s", e)
             
             # Fallback to basic system
-            print("DEBUG: Using fallback basic system")
+            logger.debug("Using fallback basic system")
             return Response({
                 'model_loaded': True,
                 'model_type': 'Rule-based Basic Checker',
@@ -2053,7 +2649,7 @@ class MLModelStatusView(APIView):
             })
             
         except Exception as e:
-            print(f"ERROR: MLModelStatusView failed: {e}")
+            logger.exception("MLModelStatusView failed")
             return Response({
                 'model_loaded': False,
                 'model_type': 'Error',
@@ -2106,70 +2702,50 @@ class CreateNewVersionView(XMLFormattingMixin, APIView):
             name_parts = os.path.splitext(original_name)
             new_filename = f"{name_parts[0]}_v{next_version_number}{name_parts[1]}"
             
-            # Copy the DOCX file to a new location
+            # Share the DOCX file with the new version; edits to either copy-on-write
             original_path = current_version.file_path
             media_dir = os.path.dirname(original_path)
             new_file_path = os.path.join(media_dir, new_filename)
-            
-            import shutil
-            shutil.copy2(original_path, new_file_path)
-            
-            # Create new document version
-            new_version = Document.objects.create(
-                filename=new_filename,
-                file_path=new_file_path,
-                is_editable=True,
-                version_number=next_version_number,
-                version_status='edited',
-                base_document=base_doc,
-                parent_document=current_version,
-                created_from_comments=True,
-                version_notes=version_notes
-            )
-            
-            # Copy paragraphs from current version
-            current_paragraphs = current_version.paragraphs.all().order_by('paragraph_id')
-            paragraph_mapping = {}  # Map old paragraph IDs to new objects
-            
-            for old_paragraph in current_paragraphs:
-                new_paragraph = Paragraph.objects.create(
-                    document=new_version,
-                    paragraph_id=old_paragraph.paragraph_id,
-                    text=old_paragraph.text,
-                    html_content=old_paragraph.html_content,
-                    has_images=old_paragraph.has_images
+            _run_docx_write(self._clone_docx, original_path, new_file_path)
+            
+            # The version row, its paragraphs and image links, and the parent's
+            # status change commit together (one transaction, one commit)
+            with transaction.atomic():
+                # Create new document version
+                new_version = Document.objects.create(
+                    filename=new_filename,
+                    file_path=new_file_path,
+                    is_editable=True,
+                    version_number=next_version_number,
+                    version_status='edited',
+                    base_document=base_doc,
+                    parent_document=current_version,
+                    created_from_comments=True,
+                    version_notes=version_notes
                 )
-                paragraph_mapping[old_paragraph.paragraph_id] = new_paragraph
                 
-                # Copy paragraph images if any
-                for para_image in old_paragraph.paragraph_images.all():
-                    # Note: We're reusing the same DocumentImage objects
-                    # since they're shared across versions
-                    ParagraphImage.objects.create(
-                        paragraph=new_paragraph,
-                        document_image=para_image.document_image,
-                        position_in_paragraph=para_image.position_in_paragraph
+                # Copy paragraphs from current version
+                copy_paragraphs_to_version(current_version, new_version)
+                
+                # Get comments to process
+                if selected_comment_ids:
+                    comments_to_process = current_version.comments.filter(
+                        comment_id__in=selected_comment_ids
                     )
-            
-            # Get comments to process
-            if selected_comment_ids:
-                comments_to_process = current_version.comments.filter(
-                    comment_id__in=selected_comment_ids
-                )
-            else:
-                comments_to_process = current_version.comments.all()
-            
-            # Record which comments were processed
-            processed_ids = list(comments_to_process.values_list('comment_id', flat=True))
-            new_version.processed_comment_ids = processed_ids
-            new_version.save()
-            
-            # Update current version status
-            current_version.version_status = 'archived'
-            current_version.save()
+                else:
+                    comments_to_process = current_version.comments.all()
+                
+                # Record which comments were processed
+                processed_ids = list(comments_to_process.values_list('comment_id', flat=True))
+                new_version.processed_comment_ids = processed_ids
+                new_version.save()
+                
+                # Update current version status
+                current_version.version_status = 'archived'
+                current_version.save()
+                _forget_docx_file(current_version.file_path)
             
             # Parse the new document to update content
-            from .docx_parser import EnhancedDocxParser
             parser = EnhancedDocxParser(new_file_path, new_version)
             paragraphs_data = parser.parse_document()
             
@@ -2190,7 +2766,7 @@ class CreateNewVersionView(XMLFormattingMixin, APIView):
         except Document.DoesNotExist:
             return Response({'error': 'Document not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
-            print(f"Error creating new version: {e}")
+            logger.exception("Error creating new version")
             return Response({
                 'error': f'Error creating new version: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -2204,10 +2780,15 @@ class GetDocumentVersionsView(APIView):
     def get(self, request, document_id):
         try:
             document = Document.objects.get(id=document_id)
-            base_doc = document.base_document or document
+            # The FK column is enough; the base row itself is fetched with the versions
+            base_document_id = document.base_document_id or document.id
             
+            # Comment counts come back in the same SELECT instead of one COUNT per version
             versions = Document.objects.filter(
-                Q(id=base_doc.id) | Q(base_document=base_doc)
+                Q(id=base_document_id) | Q(base_document_id=base_document_id)
+            ).annotate(comment_count=Count('comments')).only(
+                'id', 'version_number', 'filename', 'version_status', 'created_from_comments',
+                'uploaded_at', 'version_notes', 'processed_comment_ids'
             ).order_by('version_number')
             
             versions_data = []
@@ -2218,7 +2799,7 @@ class GetDocumentVersionsView(APIView):
                     'filename': version.filename,
                     'version_status': version.version_status,
                     'created_from_comments': version.created_from_comments,
-                    'comment_count': version.comments.count(),
+                    'comment_count': version.comment_count,
                     'uploaded_at': version.uploaded_at.isoformat(),
                     'version_notes': version.version_notes,
                     'processed_comment_ids': version.processed_comment_ids,
@@ -2226,7 +2807,7 @@ class GetDocumentVersionsView(APIView):
                 })
             
             return Response({
-                'base_document_id': base_doc.id,
+                'base_document_id': base_document_id,
                 'current_version_id': document.id,
                 'total_versions': len(versions_data),
                 'versions': versions_data
@@ -2247,19 +2828,31 @@ class DocumentVersionStatsView(APIView):
     
     def get(self, request):
         try:
-            total_documents = Document.objects.count()
-            original_documents = Document.objects.filter(version_number=1).count()
-            edited_versions = Document.objects.filter(version_number__gt=1).count()
+            # Every figure comes from one aggregate query. The comments join
+            # repeats a document once per comment, so all counts are distinct.
+            stats = Document.objects.aggregate(
+                total_documents=Count('id', distinct=True),
+                original_documents=Count('id', distinct=True, filter=Q(version_number=1)),
+                edited_versions=Count('id', distinct=True, filter=Q(version_number__gt=1)),
+                docs_with_comments=Count('id', distinct=True, filter=Q(comments__isnull=False)),
+                **{
+                    f'status_{status_key}': Count('id', distinct=True, filter=Q(version_status=status_key))
+                    for status_key, _ in Document.VERSION_STATUS_CHOICES
+                }
+            )
+            total_documents = stats['total_documents']
+            original_documents = stats['original_documents']
+            edited_versions = stats['edited_versions']
             
             # Status distribution
-            status_counts = {}
-            for status_choice in Document.VERSION_STATUS_CHOICES:
-                status_key = status_choice[0]
-                status_counts[status_key] = Document.objects.filter(version_status=status_key).count()
+            status_counts = {
+                status_key: stats[f'status_{status_key}']
+                for status_key, _ in Document.VERSION_STATUS_CHOICES
+            }
             
             # Comments to processing stats
-            commented_docs = Document.objects.filter(version_status='commented').count()
-            docs_with_comments = Document.objects.filter(comments__isnull=False).distinct().count()
+            commented_docs = status_counts.get('commented', 0)
+            docs_with_comments = stats['docs_with_comments']
             
             return Response({
                 'total_documents': total_documents,
@@ -1,12 +1,22 @@
-from docx_editor.models import Document, Paragraph, Comment
+from docx_editor.models import Document
 
 def make_document_editable(document_id):
     """Make a document editable and return it"""
     try:
         document = Document.objects.get(id=document_id)
         if not document.is_editable:
+            # Write just the flag rather than saving every column of the row. The
+            # UPDATE is conditional, so it is a no-op if another request got there first
+            Document.objects.filter(id=document.id, is_editable=False).update(is_editable=True)
             document.is_editable = True
-            document.save()
         return document
     except Document.DoesNotExist:
-        return None
\ No newline at end of file
+        return None
+
+def ensure_document_editable(document_id):
+    """Make a document editable without loading it; return whether it exists"""
+    # Only a row that still needs the flag is written; an already editable
+    # document costs a read rather than a row lock
+    if Document.objects.filter(id=document_id, is_editable=False).update(is_editable=True):
+        return True
+    return Document.objects.filter(id=document_id).exists()
\ No newline at end of file
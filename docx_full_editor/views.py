@@ -1,29 +1,22 @@
-import os
-from django.conf import settings
 from django.http import FileResponse
 from rest_framework import status
-from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from docx_editor.models import Document, Paragraph, Comment
-from docx_editor.serializers import DocumentSerializer
+from docx_editor.models import Document
 from docx_editor.views import (
+    ListDocumentsView,
     UploadDocumentView as BaseUploadView,
     EditParagraphView as BaseEditParagraphView,
     AddParagraphView as BaseAddParagraphView,
     DeleteParagraphView as BaseDeleteParagraphView,
     AddCommentView as BaseAddCommentView,
     DeleteCommentView as BaseDeleteCommentView,
-    XMLFormattingMixin
+    FILE_RESPONSE_BLOCK_SIZE,
+    paragraph_payloads,
+    parse_pending_response,
+    _wait_for_docx_writes
 )
-from .utils import make_document_editable
-
-class ListDocumentsView(APIView):
-    def get(self, request):
-        # List all documents
-        documents = Document.objects.all()
-        serializer = DocumentSerializer(documents, many=True)
-        return Response(serializer.data)
+from .utils import ensure_document_editable, make_document_editable
 
 class EditorUploadDocumentView(BaseUploadView):
     def post(self, request):
@@ -34,9 +27,7 @@ class EditorUploadDocumentView(BaseUploadView):
             # Update the document to be editable
             # The response structure is: {'status': 'success', 'data': {'document_id': ...}}
             document_id = response.data['data']['document_id']
-            document = Document.objects.get(id=document_id)
-            document.is_editable = True
-            document.save()
+            Document.objects.filter(id=document_id, is_editable=False).update(is_editable=True)
         
         return response
 
@@ -47,38 +38,19 @@ class EditDocumentView(APIView):
             return Response({'error': 'Document not found'}, 
                           status=status.HTTP_404_NOT_FOUND)
         
-        paragraphs_data = []
-        for para in document.paragraphs.all().order_by('paragraph_id'):
-            para_data = {
-                'id': para.paragraph_id,
-                'text': para.text,
-                'html_content': para.html_content,
-                'has_images': para.has_images
-            }
-            
-            # Add image information if paragraph has images
-            if para.has_images:
-                images = []
-                for para_img in para.paragraph_images.all():
-                    images.append({
-                        'id': para_img.document_image.id,
-                        'filename': para_img.document_image.filename,
-                        'image_id': para_img.document_image.image_id,
-                        'position': para_img.position_in_paragraph
-                    })
-                para_data['images'] = images
-            
-            paragraphs_data.append(para_data)
+        # Paragraph rows as dicts, with every image fetched in one query
+        paragraphs_data = list(paragraph_payloads(document))
         
-        comments_data = []
-        for comment in document.comments.all():
-            comments_data.append({
-                'id': comment.comment_id,
-                'author': comment.author,
-                'text': comment.text,
-                'paragraph_id': comment.paragraph.paragraph_id,
-                'created_at': comment.created_at
-            })
+        # Only the fields returned; the paragraph number comes from the join
+        comments_data = [{
+            'id': comment['comment_id'],
+            'author': comment['author'],
+            'text': comment['text'],
+            'paragraph_id': comment['paragraph__paragraph_id'],
+            'created_at': comment['created_at']
+        } for comment in document.comments.values(
+            'comment_id', 'author', 'text', 'paragraph__paragraph_id', 'created_at'
+        )]
         
         return Response({
             'document_id': document.id,
@@ -95,11 +67,8 @@ class EditDocumentView(APIView):
         })
 
 class EditParagraphView(BaseEditParagraphView):
-    def put(self, request):
-        # Let the base class handle the full request processing
-        # We'll override the document lookup to make it editable
-        return super().put(request)
-    
+    # The base class handles the full request; only the document lookup is
+    # overridden, to make it editable
     def get_document(self, document_id):
         """Override document lookup to make it editable"""
         return make_document_editable(document_id)
@@ -107,8 +76,7 @@ class EditParagraphView(BaseEditParagraphView):
 class AddParagraphView(BaseAddParagraphView):
     def post(self, request):
         document_id = request.data.get('document_id')
-        document = make_document_editable(document_id)
-        if not document:
+        if not ensure_document_editable(document_id):
             return Response({'error': 'Document not found'}, 
                           status=status.HTTP_404_NOT_FOUND)
         
@@ -118,8 +86,7 @@ class DeleteParagraphView(BaseDeleteParagraphView):
     def delete(self, request):
         # First ensure document is editable using the parsed data
         document_id = request.data.get('document_id')
-        document = make_document_editable(document_id)
-        if not document:
+        if not ensure_document_editable(document_id):
             return Response({'error': 'Document not found'}, 
                           status=status.HTTP_404_NOT_FOUND)
         
@@ -128,8 +95,7 @@ class DeleteParagraphView(BaseDeleteParagraphView):
 class AddCommentView(BaseAddCommentView):
     def post(self, request):
         document_id = request.data.get('document_id')
-        document = make_document_editable(document_id)
-        if not document:
+        if not ensure_document_editable(document_id):
             return Response({'error': 'Document not found'}, 
                           status=status.HTTP_404_NOT_FOUND)
         
@@ -143,26 +109,36 @@ class ExportDocumentView(APIView):
                 return Response({'error': 'Document not found'}, 
                               status=status.HTTP_404_NOT_FOUND)
             
+            not_ready = parse_pending_response(document.parse_status)
+            if not_ready:
+                return not_ready
+            
             # Ensure filename has .docx extension
             export_filename = document.filename
             if not export_filename.lower().endswith('.docx'):
                 export_filename += '.docx'
             
-            if os.path.exists(document.file_path):
-                try:
-                    response = FileResponse(
-                        open(document.file_path, 'rb'),
-                        as_attachment=True,
-                        filename=f"edited_{export_filename}",
-                        content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-                    )
-                    return response
-                except Exception as e:
-                    return Response({'error': f'Error reading file: {str(e)}'}, 
-                                  status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            else:
+            # A write in progress on the file lands before it is read
+            _wait_for_docx_writes(document.file_path)
+            
+            try:
+                # Unbuffered, like the base export: FileResponse reads whole blocks
+                # itself, and servers with wsgi.file_wrapper sendfile() from the fd.
+                # A missing file surfaces here, so there's no separate exists() stat
+                response = FileResponse(
+                    open(document.file_path, 'rb', buffering=0),
+                    as_attachment=True,
+                    filename=f"edited_{export_filename}",
+                    content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+                )
+                response.block_size = FILE_RESPONSE_BLOCK_SIZE
+                return response
+            except FileNotFoundError:
                 return Response({'error': f'File not found at path: {document.file_path}'}, 
                               status=status.HTTP_404_NOT_FOUND)
+            except Exception as e:
+                return Response({'error': f'Error reading file: {str(e)}'}, 
+                              status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         except Exception as e:
             return Response({'error': f'Export error: {str(e)}'}, 
                           status=status.HTTP_500_INTERNAL_SERVER_ERROR)